@@ -12,6 +12,9 @@ from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
 from database import Database
 
+# Usernames that see the admin pages (Query Performance), comma-separated
+ADMIN_USERNAMES = {name.strip() for name in os.environ.get('APP_ADMINS', '').split(',') if name.strip()}
+
 # Page config
 st.set_page_config(
     page_title="Ayurveda Teacher's App",
@@ -30,15 +33,14 @@ db = init_db()
 @st.cache_resource
 def check_and_import_data():
     """Check if database has subjects, if not import from Excel"""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM syllabus_master")
-    count = cursor.fetchone()[0]
-    conn.close()
+    count = db.count_slos()
     
     if count == 0:
-        # Database is empty, try to import
+        # Database is empty: load the prebuilt snapshot, else import from Excel
         excel_path = os.path.join(os.path.dirname(__file__), 'LMS_All_Sheets_Combined.xlsx')
+        snapshot_path = os.path.join(os.path.dirname(__file__), 'syllabus_snapshot.db.gz')
+        if db.load_snapshot(snapshot_path, excel_path) > 0:
+            return True
         if os.path.exists(excel_path):
             st.info("🔄 First-time setup: Importing data...")
             from import_data import import_excel
@@ -85,16 +87,7 @@ def login_page():
     
     with col2:
         # Get all subjects
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT DISTINCT subject_code, subject_name, year, COUNT(*) as cnt
-            FROM syllabus_master
-            GROUP BY subject_code
-            ORDER BY year, subject_code
-        ''')
-        all_subjects = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        all_subjects = db.get_subjects()
         
         with st.form("login"):
             st.markdown("### 🔐 Login")
@@ -141,19 +134,13 @@ def login_page():
                     st.session_state.logged_in = True
                     st.session_state.teacher_id = teacher['teacher_id']
                     st.session_state.teacher_name = teacher['full_name']
+                    st.session_state.is_admin = teacher['username'] in ADMIN_USERNAMES
                     st.session_state.selected_subject_code = selected_subject_code
                     st.session_state.selected_subject_name = selected_subject_name
                     
                     # Auto-assign
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO teacher_subject_assignments 
-                        (teacher_id, subject_code, year, academic_year, status)
-                        VALUES (?, ?, ?, '2025-26', 'active')
-                    ''', (teacher['teacher_id'], selected_subject_code, selected_subject['year']))
-                    conn.commit()
-                    conn.close()
+                    db.assign_subject_to_teacher(teacher['teacher_id'], selected_subject_code,
+                                                 selected_subject['year'], '2025-26')
                     
                     st.success(f"✅ Logged in to {selected_subject_name}!")
                     st.rerun()
@@ -180,6 +167,8 @@ def main_app():
             "📥 Export Reports": "Export Reports",
             "📚 Abbreviations": "Abbreviations"
         }
+        if st.session_state.get('is_admin'):
+            menu["🛠️ Query Performance"] = "Query Performance"
         
         for label, page in menu.items():
             if st.button(label, use_container_width=True):
@@ -199,33 +188,39 @@ def main_app():
     # Main content
     page = st.session_state.current_page
     
-    if page == "Dashboard":
-        from dashboard import show as show_dashboard
-        show_dashboard(db, st.session_state.teacher_id, '2025-26')
-    elif page == "Browse SLOs":
-        from slo_browser_enhanced import show as show_browser
-        show_browser(db, st.session_state.teacher_id, '2025-26')
-    elif page == "My Planned SLOs":
-        from planned_slos import show as show_planned
-        show_planned(db, st.session_state.teacher_id, '2025-26')
-    elif page == "Teaching Diary":
-        from teaching_diary import show as show_diary
-        show_diary(db, st.session_state.teacher_id, '2025-26')
-    elif page == "Coverage":
-        from coverage import show as show_coverage
-        show_coverage(db, st.session_state.teacher_id, '2025-26')
-    elif page == "Monthly Reports":
-        from monthly_reports import show as show_monthly
-        show_monthly(db, st.session_state.teacher_id, '2025-26')
-    elif page == "Export Reports":
-        from reports import show as show_reports
-        show_reports(db, st.session_state.teacher_id, '2025-26')
-    elif page == "Abbreviations":
-        from abbreviations import show as show_abbr
-        show_abbr(db, st.session_state.teacher_id, '2025-26')
+    # Queries run below are attributed to the page (see Database.page)
+    with db.page(page):
+        if page == "Dashboard":
+            from dashboard import show as show_dashboard
+            show_dashboard(db, st.session_state.teacher_id, '2025-26')
+        elif page == "Browse SLOs":
+            from slo_browser_enhanced import show as show_browser
+            show_browser(db, st.session_state.teacher_id, '2025-26')
+        elif page == "My Planned SLOs":
+            from planned_slos import show as show_planned
+            show_planned(db, st.session_state.teacher_id, '2025-26')
+        elif page == "Teaching Diary":
+            from teaching_diary import show as show_diary
+            show_diary(db, st.session_state.teacher_id, '2025-26')
+        elif page == "Coverage":
+            from coverage import show as show_coverage
+            show_coverage(db, st.session_state.teacher_id, '2025-26')
+        elif page == "Monthly Reports":
+            from monthly_reports import show as show_monthly
+            show_monthly(db, st.session_state.teacher_id, '2025-26')
+        elif page == "Export Reports":
+            from reports import show as show_reports
+            show_reports(db, st.session_state.teacher_id, '2025-26')
+        elif page == "Abbreviations":
+            from abbreviations import show as show_abbr
+            show_abbr(db, st.session_state.teacher_id, '2025-26')
+        elif page == "Query Performance" and st.session_state.get('is_admin'):
+            from query_performance import show as show_query_performance
+            show_query_performance(db, st.session_state.teacher_id, '2025-26')
 
 if __name__ == "__main__":
     if not st.session_state.logged_in:
-        login_page()
+        with db.page("Login"):
+            login_page()
     else:
         main_app()
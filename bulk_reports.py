@@ -0,0 +1,154 @@
+"""
+BULK REPORT GENERATOR - every teacher x subject x month of an academic year
+Writes the Monthly Reports export for each combination into one zip file
+Location: bulk_reports.py
+
+Usage: python bulk_reports.py 2025-26 [--format csv|xlsx|both] [--workers N] [--output FILE]
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
+from database import COVERAGE_BETWEEN_SQL, default_db_location, iter_cursor, month_range, open_backend
+from exports import write_csv, write_xlsx
+
+# Academic years run July-June unless academic_calendar has term dates
+ACADEMIC_YEAR_START_MONTH = 7
+
+# Set in each worker process by init_worker
+_worker = {}
+
+def open_read_connection(db_path):
+    """Read-only connection; workers never write to the live database"""
+    return open_backend(db_path).connect_read_only()
+
+def academic_months(conn, academic_year):
+    """(year, month) pairs covered by an academic year such as '2025-26'"""
+    start, end = conn.execute('''
+        SELECT MIN(term_start_date), MAX(term_end_date)
+        FROM academic_calendar WHERE academic_year = ?
+    ''', (academic_year,)).fetchone()
+    if start and end:
+        start, end = date.fromisoformat(start[:10]), date.fromisoformat(end[:10])
+        count = (end.year - start.year) * 12 + end.month - start.month + 1
+    else:
+        start, count = date(int(academic_year[:4]), ACADEMIC_YEAR_START_MONTH, 1), 12
+
+    first = start.year * 12 + start.month - 1
+    return [(index // 12, index % 12 + 1) for index in range(first, first + count)]
+
+def report_jobs(conn, academic_year):
+    """Active teacher/subject assignments of the year: (teacher_id, username, subject_code)"""
+    return conn.execute('''
+        SELECT DISTINCT tsa.teacher_id, t.username, tsa.subject_code
+        FROM teacher_subject_assignments tsa
+        JOIN teachers t ON t.teacher_id = tsa.teacher_id
+        WHERE tsa.academic_year = ? AND tsa.status = 'active'
+        ORDER BY t.username, tsa.subject_code
+    ''', (academic_year,)).fetchall()
+
+def init_worker(db_path, out_dir, formats):
+    """Open the worker's one read connection, reused for all its reports"""
+    _worker['conn'] = open_read_connection(db_path)
+    _worker['out_dir'] = out_dir
+    _worker['formats'] = formats
+
+def write_teacher_subject(job):
+    """Write every month's report for one teacher and subject
+
+    Returns (path in the archive, teacher, subject, month, SLO count) per file.
+    """
+    teacher_id, username, subject_code, months = job
+    conn = _worker['conn']
+    folder = f"{safe_name(username)}/{safe_name(subject_code)}"
+    os.makedirs(os.path.join(_worker['out_dir'], folder), exist_ok=True)
+
+    written = []
+    for year, month in months:
+        params = (teacher_id, subject_code, *month_range(year, month))
+        for fmt in _worker['formats']:
+            name = f"{folder}/{year}-{month:02d}.{fmt}"
+            with open(os.path.join(_worker['out_dir'], name), 'wb') as out:
+                rows = iter_cursor(conn.execute(COVERAGE_BETWEEN_SQL, params))
+                if fmt == 'xlsx':
+                    count = write_xlsx(rows, out, sheet_name='Completed SLOs')
+                else:
+                    count = write_csv(rows, out)
+            written.append((name, username, subject_code, f"{year}-{month:02d}", count))
+    return written
+
+def safe_name(text):
+    """File-system safe version of a username or subject code"""
+    return ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in str(text))
+
+def generate_reports(db_path, academic_year, output, formats=('csv',), workers=None):
+    """Build every teacher x subject x month report of a year into a zip file
+
+    Assignments are split across a process pool; each worker holds one
+    read-only connection and streams its reports straight to disk. Returns
+    the number of report files written.
+    """
+    run_start = time.perf_counter()
+    conn = open_read_connection(db_path)
+    months = academic_months(conn, academic_year)
+    jobs = [(teacher_id, username, subject_code, months)
+            for teacher_id, username, subject_code in report_jobs(conn, academic_year)]
+    conn.close()
+
+    if not jobs:
+        print(f"⚠️ No active teacher assignments for {academic_year}")
+        return 0
+    if not months:
+        print(f"⚠️ academic_calendar terms for {academic_year} end before they start")
+        return 0
+
+    print(f"📊 {len(jobs)} teacher/subject assignments x {len(months)} months "
+          f"({months[0][0]}-{months[0][1]:02d} to {months[-1][0]}-{months[-1][1]:02d})")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        written = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(db_path, out_dir, formats)) as pool:
+            for files in pool.map(write_teacher_subject, jobs):
+                written.extend(files)
+                if files:
+                    print(f"  ✅ {files[0][1]} / {files[0][2]}: {len(files)} reports")
+
+        index_path = os.path.join(out_dir, 'index.csv')
+        with open(index_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['file', 'teacher', 'subject_code', 'month', 'slos_completed'])
+            writer.writerows(written)
+
+        root = f"reports_{academic_year}"
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(index_path, f"{root}/index.csv")
+            for rel_path, *_ in written:
+                archive.write(os.path.join(out_dir, rel_path), f"{root}/{rel_path}")
+
+    print(f"\n✅ {len(written)} reports written to {output} in {time.perf_counter() - run_start:.2f}s")
+    return len(written)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate every monthly report of an academic year")
+    parser.add_argument('academic_year', help="e.g. 2025-26")
+    parser.add_argument('--format', choices=['csv', 'xlsx', 'both'], default='csv')
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--output', help="zip file to write (default: reports_<academic_year>.zip)")
+    parser.add_argument('--db', help="database file or postgresql:// URL (default: the app's database)")
+    args = parser.parse_args()
+
+    db_path = args.db or default_db_location()
+    if not db_path.startswith(('postgresql://', 'postgres://')) and not os.path.exists(db_path):
+        sys.exit(f"❌ Database not found: {db_path}")
+    formats = ('csv', 'xlsx') if args.format == 'both' else (args.format,)
+    generate_reports(db_path, args.academic_year, args.output or f"reports_{args.academic_year}.zip",
+                     formats=formats, workers=args.workers)
@@ -5,13 +5,55 @@ Location: import_data.py
 """
 
 import pandas as pd
+import hashlib
 import json
+import sqlite3
+import gzip
 import re
+import shutil
 import sys
 import os
+import tempfile
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
-from database import Database
+from database import Database, SNAPSHOT_FORMAT, file_sha1
+
+# Prebuilt syllabus shipped next to app.py (see build_snapshot)
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'syllabus_snapshot.db.gz')
+
+SYLLABUS_COLUMNS = (
+    'subject_code', 'subject_name', 'year', 'topic_number',
+    'learning_objective_text',
+    'domain_code', 'domain_full',
+    'priority_level', 'priority_full',
+    'competency_level', 'competency_full',
+    'teaching_methods_codes', 'teaching_methods_full',
+    'assessment_methods_codes', 'assessment_methods_full',
+    'assessment_type', 'assessment_type_full',
+    'term', 'integration_codes', 'integration_full',
+    'course_outcome', 'programme_outcome',
+)
+SYLLABUS_REQUIRED = {'subject_code', 'subject_name', 'year', 'learning_objective_text'}
+# Every imported record carries its identity key and content hash at the end
+IMPORT_COLUMNS = SYLLABUS_COLUMNS + ('slo_key', 'content_hash')
+INSERT_SYLLABUS_SQL = (
+    f"INSERT INTO syllabus_master ({', '.join(IMPORT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(IMPORT_COLUMNS))})"
+)
+UPDATE_SYLLABUS_SQL = (
+    f"UPDATE syllabus_master SET {', '.join(f'{col} = ?' for col in IMPORT_COLUMNS)}, "
+    f"status = 'active', updated_at = CURRENT_TIMESTAMP WHERE syllabus_id = ?"
+)
+
+# Bulk-load settings; the previous values are restored when the import ends.
+# journal_mode stays WAL (set by the connection pool): it cannot be switched
+# while the app holds other connections, and WAL already suits bulk writes.
+IMPORT_PRAGMAS = {
+    'synchronous': 'OFF',
+}
 
 def clean_text(text):
     """Clean text"""
@@ -26,14 +68,487 @@ def parse_list(text):
     items = re.split(r'[,;/()]', str(text))
     return [item.strip() for item in items if item.strip() and len(item.strip()) > 1]
 
-def import_excel(excel_path, db):
-    """Import from YOUR Excel file"""
+# Classification rules - first match wins, anything unmatched gets the default
+DOMAIN_RULES = [
+    (('recall', 'knowledge'), 'CK', 'Cognitive / Knowledge'),
+    (('application',), 'CAP', 'Cognitive / Application'),
+    (('analysis',), 'CAN', 'Cognitive / Analysis'),
+    (('psychomotor',), 'PSY-MEC', 'Psychomotor / Mechanism'),
+    (('affective',), 'AFT-RES', 'Affective / Responding'),
+]
+DOMAIN_DEFAULT = ('CC', 'Cognitive / Comprehension')
+
+PRIORITY_RULES = [
+    (('Dk', 'Desirable'), 'Dk', 'Desirable to know'),
+    (('Nk', 'Nice'), 'Nk', 'Nice to know'),
+]
+PRIORITY_DEFAULT = ('Mk', 'Must know')
+
+COMPETENCY_DEFAULT = ('Kh', 'Knows How')
+ASSESSMENT_TYPE_DEFAULT = ('F & S', 'Formative & Summative')
+ASSESSMENT_TYPES = {'S': ('S', 'Summative'), 'F': ('F', 'Formative')}
+TERMS = ['I', 'II', 'III']
+
+def clean_column(df, col):
+    """Column-wise clean_text: stripped strings, None for blanks"""
+    if col is None:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    values = df[col]
+    cleaned = values.astype(object).where(values.isna(), values.astype(str).str.strip())
+    return cleaned.astype(object).where(values.notna(), None)
+
+def contains_any(series, needles):
+    """Boolean mask: series contains any of the needles (blanks never match)"""
+    mask = pd.Series(False, index=series.index)
+    for needle in needles:
+        mask |= series.str.contains(needle, regex=False, na=False)
+    return mask
+
+def apply_rules(series, rules, default):
+    """Map each value to (code, full) using the first matching rule"""
+    codes = pd.Series(default[0], index=series.index, dtype=object)
+    fulls = pd.Series(default[1], index=series.index, dtype=object)
+    # Apply in reverse so earlier rules overwrite later ones
+    for mask, code, full in reversed(rules):
+        codes = codes.mask(mask, code)
+        fulls = fulls.mask(mask, full)
+    return codes, fulls
+
+def encode_lists(series, default, limit=None):
+    """JSON-encoded parse_list for every value, parsing each distinct value once"""
+    lookup = {value: json.dumps(parse_list(value)[:limit])
+              for value in series.dropna().unique() if value}
+    fallback = json.dumps(default)
+    return series.map(lambda value: lookup.get(value, fallback) if value else fallback)
+
+def classify_sheet(df, col_map):
+    """Classify the A3-J3 columns of one sheet into syllabus_master fields
+
+    Works column by column; returns one row per valid learning objective.
+    """
+    col = lambda key: clean_column(df, col_map.get(key))
+    
+    # A3: topic rows ("Topic 1 Swastha and Swasthya") and CO rows, forward-filled
+    a3 = col('A3')
+    is_topic = a3.str.contains('Topic', regex=False, na=False)
+    is_co = ~is_topic & a3.str.startswith('CO', na=False)
+    topic_short = a3.str.split().str[:2].str.join(' ')
+    current_topic = topic_short.where(is_topic).mask(is_co, a3).ffill()
+    current_topic_full = a3.where(is_topic).ffill()
+    # Before the first Topic row, the first CO row stands in as the full name
+    if is_co.any():
+        first_co = is_co.idxmax()
+        before_topic = current_topic_full.isna() & (df.index >= first_co)
+        current_topic_full = current_topic_full.mask(before_topic, a3[first_co])
+    
+    # B3: learning objective
+    lo = col('B3')
+    valid = lo.str.len().ge(10).fillna(False).astype(bool)
+    valid &= ~lo.str.lower().str.contains('learning objective', regex=False, na=False)
+    
+    # C3: Domain
+    c3 = col('C3').str.lower()
+    domain_code, domain_full = apply_rules(
+        c3, [(contains_any(c3, needles), code, full) for needles, code, full in DOMAIN_RULES],
+        DOMAIN_DEFAULT)
+    
+    # D3: Priority
+    d3 = col('D3')
+    priority, priority_full = apply_rules(
+        d3, [(contains_any(d3, needles), code, full) for needles, code, full in PRIORITY_RULES],
+        PRIORITY_DEFAULT)
+    
+    # E3: Competency
+    e3 = col('E3')
+    comp, comp_full = apply_rules(e3, [
+        ((e3 == 'D') | contains_any(e3, ['Does']), 'D', 'Does'),
+        (contains_any(e3, ['Sh', 'Shows']), 'Sh', 'Shows How'),
+        ((e3 == 'K') | contains_any(e3, ['Know ']), 'K', 'Knows'),
+    ], COMPETENCY_DEFAULT)
+    
+    # H3: Assessment type
+    h3 = col('H3')
+    assess_type, assess_type_full = apply_rules(
+        h3, [(h3 == key, code, full) for key, (code, full) in ASSESSMENT_TYPES.items()],
+        ASSESSMENT_TYPE_DEFAULT)
+    
+    # I3: Term
+    i3 = col('I3')
+    term = i3.where(i3.isin(TERMS), 'I')
+    
+    rows = pd.DataFrame({
+        'topic_full': current_topic_full.fillna('Topic 1'),
+        'topic': current_topic.fillna('CO 1'),
+        'lo': lo,
+        'domain_code': domain_code, 'domain_full': domain_full,
+        'priority': priority, 'priority_full': priority_full,
+        'comp': comp, 'comp_full': comp_full,
+        # F3/G3: Teaching & assessment methods, J3: Integration
+        'f3': encode_lists(col('F3'), ['Lecture'], 3),
+        'g3': encode_lists(col('G3'), ['Written'], 3),
+        'assess_type': assess_type, 'assess_type_full': assess_type_full,
+        'term': term,
+        'j3': encode_lists(col('J3'), []),
+    })
+    return rows[valid]
+
+def iter_sheets(excel_path, sheet_names):
+    """Yield (sheet_name, DataFrame, load_seconds) from ONE pass over the workbook
+
+    The workbook zip and its shared strings are parsed once; each
+    requested sheet is handed out as soon as it has been read.
+    """
+    with pd.ExcelFile(excel_path) as xl:
+        for sheet_name in xl.sheet_names:
+            if sheet_name not in sheet_names:
+                continue
+            start = time.perf_counter()
+            df = xl.parse(sheet_name)
+            yield sheet_name, df, time.perf_counter() - start
+
+def parse_sheet(df, code, name, year):
+    """Parse one LMS sheet into (row_index, syllabus_master record) pairs
+
+    Raises ValueError when the sheet has no usable A3-J3 header.
+    """
+    # Find header (row with "A3 Course outcome")
+    header_row = None
+    for idx in range(30):
+        if idx >= len(df):
+            break
+        row_str = ' '.join([str(v) for v in df.iloc[idx] if pd.notna(v)])
+        if 'A3' in row_str and 'Course outcome' in row_str:
+            header_row = idx
+            break
+    
+    if header_row is None:
+        raise ValueError("Header not found")
+    
+    # Set columns
+    df.columns = df.iloc[header_row]
+    df = df.iloc[header_row + 1:].reset_index(drop=True)
+    
+    # Column mapping
+    col_map = {}
+    for col in df.columns:
+        col_str = str(col).lower()
+        if 'a3' in col_str or 'course outcome' in col_str:
+            col_map['A3'] = col
+        elif 'b3' in col_str or 'learning objective' in col_str:
+            col_map['B3'] = col
+        elif 'c3' in col_str or 'domain' in col_str:
+            col_map['C3'] = col
+        elif 'd3' in col_str or 'must' in col_str:
+            col_map['D3'] = col
+        elif 'e3' in col_str or 'level' in col_str:
+            col_map['E3'] = col
+        elif 'f3' in col_str or 't-l' in col_str:
+            col_map['F3'] = col
+        elif 'g3' in col_str or ('assessment' in col_str and 'formative' not in col_str):
+            col_map['G3'] = col
+        elif 'h3' in col_str or 'formative' in col_str:
+            col_map['H3'] = col
+        elif 'i3' in col_str or col_str.strip() == 'term':
+            col_map['I3'] = col
+        elif 'j3' in col_str or 'integration' in col_str:
+            col_map['J3'] = col
+    
+    if 'B3' not in col_map:
+        raise ValueError("Learning objective column not found")
+    
+    rows = classify_sheet(df, col_map)
+    return [
+        (row.Index, (
+            code, name, year, row.topic_full,
+            row.lo,
+            row.domain_code, row.domain_full,
+            row.priority, row.priority_full,
+            row.comp, row.comp_full,
+            row.f3, row.f3,
+            row.g3, row.g3,
+            row.assess_type, row.assess_type_full,
+            row.term, row.j3, row.j3,
+            row.topic, 'PO1, PO2'
+        ))
+        for row in rows.itertuples()
+    ]
+
+def slo_key(subject_code, topic, objective, occurrence):
+    """Stable identity of an SLO across syllabus revisions
+
+    Classification columns may change without changing the key; an edited
+    objective text is a new SLO. occurrence separates repeated objectives
+    within one topic.
+    """
+    raw = '\x1f'.join([subject_code, topic or '', objective or '', str(occurrence)])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def hash_records(records):
+    """Append (slo_key, content_hash) to each parsed record"""
+    seen = {}
+    hashed = []
+    for idx, record in records:
+        base = (record[0], record[3], record[4])
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        content_hash = hashlib.sha1(
+            json.dumps(record, ensure_ascii=False).encode('utf-8')).hexdigest()
+        hashed.append((idx, record + (slo_key(*base, occurrence), content_hash)))
+    return hashed
+
+def sheet_hash(records):
+    """Content hash of a whole sheet from its hashed records"""
+    digest = hashlib.sha1()
+    for _, record in records:
+        digest.update(f"{record[-2]}:{record[-1]}\n".encode('ascii'))
+    return digest.hexdigest()
+
+def validate_records(records):
+    """Split records into (good, rejects) on the NOT NULL syllabus columns"""
+    rejects = []
+    good = []
+    for idx, record in records:
+        missing = [col for col, value in zip(SYLLABUS_COLUMNS, record)
+                   if col in SYLLABUS_REQUIRED and value in (None, '')]
+        if missing:
+            rejects.append((idx, f"missing {', '.join(missing)}"))
+        else:
+            good.append((idx, record))
+    return good, rejects
+
+def parse_job(df, code, name, year):
+    """Parse and hash one sheet; runs in a worker process when parallel
+
+    Returns (records, error, parse_seconds) so that failures travel back
+    to the writer instead of aborting the pool.
+    """
+    start = time.perf_counter()
+    try:
+        records = hash_records(parse_sheet(df, code, name, year))
+        error = None
+    except ValueError as e:
+        records, error = None, str(e)
+    return records, error, time.perf_counter() - start
+
+def parse_sheets(excel_path, subjects, workers=None):
+    """Yield (sheet_name, records, error, load_seconds, parse_seconds) in workbook order
+
+    With workers > 1 each sheet is handed to a process pool as soon as it
+    has been read, while the workbook keeps loading; results are still
+    yielded in workbook order so the import is deterministic.
+    """
+    if not workers or workers < 2:
+        for sheet_name, df, load_time in iter_sheets(excel_path, subjects):
+            records, error, parse_time = parse_job(df, *subjects[sheet_name])
+            yield sheet_name, records, error, load_time, parse_time
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = [
+            (sheet_name, pool.submit(parse_job, df, *subjects[sheet_name]), load_time)
+            for sheet_name, df, load_time in iter_sheets(excel_path, subjects)
+        ]
+        for sheet_name, future, load_time in pending:
+            records, error, parse_time = future.result()
+            yield sheet_name, records, error, load_time, parse_time
+
+def write_sheet(conn, records):
+    """Insert one sheet's records with executemany inside a single transaction
+
+    Returns (inserted, rejects) where rejects is a list of (row_index, error).
+    Rows that fail validation never reach the batch; if the batch still
+    fails, the sheet is rolled back and retried row by row so that only the
+    bad rows are rejected.
+    """
+    good, rejects = validate_records(records)
+    
+    try:
+        conn.execute('BEGIN')
+        conn.executemany(INSERT_SYLLABUS_SQL, [record for _, record in good])
+        conn.execute('COMMIT')
+        return len(good), rejects
+    except conn.Error:
+        conn.execute('ROLLBACK')
+    
+    inserted = 0
+    conn.execute('BEGIN')
+    for idx, record in good:
+        # A savepoint per row: PostgreSQL aborts the whole transaction on an error
+        conn.execute('SAVEPOINT row')
+        try:
+            conn.execute(INSERT_SYLLABUS_SQL, record)
+            inserted += 1
+        except conn.Error as e:
+            conn.execute('ROLLBACK TO SAVEPOINT row')
+            rejects.append((idx, str(e)))
+        conn.execute('RELEASE SAVEPOINT row')
+    conn.execute('COMMIT')
+    return inserted, rejects
+
+def backfill_slo_keys(conn, subject_code):
+    """Key rows imported before content hashing existed
+
+    Rows are numbered in syllabus_id order, so when a subject was imported
+    twice the second copy gets higher occurrences and is later deactivated;
+    move_retired_history then hands its coverage to the first copy.
+    """
+    missing = conn.execute(
+        "SELECT COUNT(*) FROM syllabus_master WHERE subject_code = ? AND slo_key IS NULL",
+        (subject_code,)).fetchone()[0]
+    if not missing:
+        return
+    
+    seen = {}
+    updates = []
+    for row in conn.execute('''
+        SELECT syllabus_id, topic_number, learning_objective_text
+        FROM syllabus_master WHERE subject_code = ? ORDER BY syllabus_id
+    ''', (subject_code,)):
+        base = (subject_code, row['topic_number'], row['learning_objective_text'])
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        updates.append((slo_key(*base, occurrence), row['syllabus_id']))
+    conn.executemany("UPDATE syllabus_master SET slo_key = ? WHERE syllabus_id = ?", updates)
+
+def move_retired_history(conn, subject_code):
+    """Repoint coverage and plans from retired SLOs to their active copy
+
+    A retired row whose topic and objective text are still active under
+    another syllabus_id (the duplicate left by importing a subject twice)
+    hands its syllabus_coverage_log and planned_slos rows to the lowest
+    such syllabus_id. Rows that would repeat an event or plan already
+    recorded there (the migration 10 unique index, planned_slos' UNIQUE)
+    are deleted instead. Runs inside the caller's transaction.
+    """
+    moves = {row['old_id']: row['new_id'] for row in conn.execute('''
+        SELECT old.syllabus_id AS old_id, MIN(kept.syllabus_id) AS new_id
+        FROM syllabus_master old
+        JOIN syllabus_master kept
+            ON kept.subject_code = old.subject_code AND kept.status = 'active'
+            AND kept.learning_objective_text = old.learning_objective_text
+            AND COALESCE(kept.topic_number, '') = COALESCE(old.topic_number, '')
+        WHERE old.subject_code = ? AND old.status = 'inactive'
+        AND old.syllabus_id IN (
+            SELECT syllabus_id FROM syllabus_coverage_log WHERE subject_code = ?
+            UNION SELECT syllabus_id FROM planned_slos WHERE subject_code = ?
+        )
+        GROUP BY old.syllabus_id
+    ''', (subject_code, subject_code, subject_code))}
+    if not moves:
+        return
+    
+    logs = [(moves[row['syllabus_id']], row['log_id'], row['syllabus_id'])
+            for row in conn.execute(
+                "SELECT log_id, syllabus_id FROM syllabus_coverage_log WHERE subject_code = ?",
+                (subject_code,))
+            if row['syllabus_id'] in moves]
+    conn.executemany('''
+        UPDATE syllabus_coverage_log SET syllabus_id = ?
+        WHERE log_id = ? AND NOT EXISTS (
+            SELECT 1 FROM syllabus_coverage_log kept
+            WHERE kept.teacher_id = syllabus_coverage_log.teacher_id
+            AND kept.syllabus_id = ?
+            AND COALESCE(kept.category, '') = COALESCE(syllabus_coverage_log.category, '')
+        )
+    ''', [(new_id, log_id, new_id) for new_id, log_id, _ in logs])
+    conn.executemany("DELETE FROM syllabus_coverage_log WHERE log_id = ? AND syllabus_id = ?",
+                     [(log_id, old_id) for _, log_id, old_id in logs])
+    
+    plans = [(moves[row['syllabus_id']], row['plan_id'], row['syllabus_id'])
+             for row in conn.execute(
+                 "SELECT plan_id, syllabus_id FROM planned_slos WHERE subject_code = ?",
+                 (subject_code,))
+             if row['syllabus_id'] in moves]
+    conn.executemany('''
+        UPDATE planned_slos SET syllabus_id = ?
+        WHERE plan_id = ? AND NOT EXISTS (
+            SELECT 1 FROM planned_slos kept
+            WHERE kept.teacher_id = planned_slos.teacher_id
+            AND kept.syllabus_id = ? AND kept.plan_type = planned_slos.plan_type
+        )
+    ''', [(new_id, plan_id, new_id) for new_id, plan_id, _ in plans])
+    conn.executemany("DELETE FROM planned_slos WHERE plan_id = ? AND syllabus_id = ?",
+                     [(plan_id, old_id) for _, plan_id, old_id in plans])
+
+def sync_sheet(conn, sheet_name, subject_code, records):
+    """Apply one sheet to syllabus_master incrementally, in one transaction
+
+    Unchanged sheets are skipped. New SLOs are inserted, changed SLOs are
+    updated in place (keeping their syllabus_id) and SLOs no longer in the
+    sheet are marked inactive; duplicate copies hand their coverage and
+    plans to the copy that stays. Returns None when the sheet was skipped,
+    otherwise (inserted, updated, deactivated, rejects).
+    """
+    digest = sheet_hash(records)
+    stored = conn.execute(
+        "SELECT content_hash FROM syllabus_import_sheets WHERE sheet_name = ?",
+        (sheet_name,)).fetchone()
+    if stored and stored[0] == digest:
+        return None
+    
+    good, rejects = validate_records(records)
+    
+    conn.execute('BEGIN')
+    try:
+        backfill_slo_keys(conn, subject_code)
+        existing = {}
+        stale = []
+        for row in conn.execute('''
+            SELECT syllabus_id, slo_key, content_hash, status
+            FROM syllabus_master WHERE subject_code = ? ORDER BY syllabus_id
+        ''', (subject_code,)):
+            if row['slo_key'] in existing:
+                stale.append(row['syllabus_id'])  # duplicate copy of an SLO
+            else:
+                existing[row['slo_key']] = row
+        
+        inserts = []
+        updates = []
+        for _, record in good:
+            current = existing.pop(record[-2], None)
+            if current is None:
+                inserts.append(record)
+            elif current['content_hash'] != record[-1] or current['status'] != 'active':
+                updates.append(record + (current['syllabus_id'],))
+        stale.extend(row['syllabus_id'] for row in existing.values()
+                     if row['status'] != 'inactive')
+        
+        conn.executemany(INSERT_SYLLABUS_SQL, inserts)
+        conn.executemany(UPDATE_SYLLABUS_SQL, updates)
+        conn.executemany('''
+            UPDATE syllabus_master SET status = 'inactive', updated_at = CURRENT_TIMESTAMP
+            WHERE syllabus_id = ?
+        ''', [(syllabus_id,) for syllabus_id in stale])
+        move_retired_history(conn, subject_code)
+        conn.execute('''
+            INSERT INTO syllabus_import_sheets
+            (sheet_name, subject_code, content_hash, row_count, imported_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (sheet_name) DO UPDATE SET
+                subject_code = excluded.subject_code, content_hash = excluded.content_hash,
+                row_count = excluded.row_count, imported_at = excluded.imported_at
+        ''', (sheet_name, subject_code, digest, len(records)))
+        conn.execute('COMMIT')
+    except conn.Error:
+        conn.execute('ROLLBACK')
+        raise
+    
+    return len(inserts), len(updates), len(stale), rejects
+
+def import_excel(excel_path, db, incremental=False, workers=None):
+    """Import from YOUR Excel file
+
+    incremental=True syncs each sheet against the existing rows (see
+    sync_sheet) instead of appending, so it is safe to run repeatedly.
+    workers > 1 parses sheets in that many processes; rows are still
+    written by this process, one sheet at a time, in workbook order.
+    """
     
     print("="*60)
     print("IMPORTING FROM YOUR EXCEL FILE")
     print("="*60)
     
-    xl = pd.ExcelFile(excel_path)
+    run_start = time.perf_counter()
     
     # Subject mapping
     subjects = {
@@ -60,214 +575,122 @@ def import_excel(excel_path, db):
     }
     
     conn = db.get_connection()
-    cursor = conn.cursor()
+    # Explicit per-sheet transactions; the import can be replayed if interrupted
+    conn.isolation_level = None
+    pragmas = IMPORT_PRAGMAS if db.backend.name == 'sqlite' else {}
+    saved_pragmas = {name: conn.execute(f'PRAGMA {name}').fetchone()[0]
+                     for name in pragmas}
     total_imported = 0
+    rejects = []
     
-    for sheet_name in xl.sheet_names:
-        if sheet_name not in subjects:
-            continue
-        
-        code, name, year = subjects[sheet_name]
-        print(f"\n📚 {name} ({code})")
-        
-        df = pd.read_excel(excel_path, sheet_name=sheet_name)
-        
-        # Find header (row with "A3 Course outcome")
-        header_row = None
-        for idx in range(30):
-            if idx >= len(df):
-                break
-            row_str = ' '.join([str(v) for v in df.iloc[idx] if pd.notna(v)])
-            if 'A3' in row_str and 'Course outcome' in row_str:
-                header_row = idx
-                break
-        
-        if header_row is None:
-            print("  ⚠️ Header not found")
-            continue
+    try:
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
         
-        # Set columns
-        df.columns = df.iloc[header_row]
-        df = df.iloc[header_row + 1:].reset_index(drop=True)
-        
-        # Column mapping
-        col_map = {}
-        for col in df.columns:
-            col_str = str(col).lower()
-            if 'a3' in col_str or 'course outcome' in col_str:
-                col_map['A3'] = col
-            elif 'b3' in col_str or 'learning objective' in col_str:
-                col_map['B3'] = col
-            elif 'c3' in col_str or 'domain' in col_str:
-                col_map['C3'] = col
-            elif 'd3' in col_str or 'must' in col_str:
-                col_map['D3'] = col
-            elif 'e3' in col_str or 'level' in col_str:
-                col_map['E3'] = col
-            elif 'f3' in col_str or 't-l' in col_str:
-                col_map['F3'] = col
-            elif 'g3' in col_str or ('assessment' in col_str and 'formative' not in col_str):
-                col_map['G3'] = col
-            elif 'h3' in col_str or 'formative' in col_str:
-                col_map['H3'] = col
-            elif 'i3' in col_str or col_str.strip() == 'term':
-                col_map['I3'] = col
-            elif 'j3' in col_str or 'integration' in col_str:
-                col_map['J3'] = col
-        
-        if 'B3' not in col_map:
-            print("  ⚠️ Learning objective column not found")
-            continue
-        
-        count = 0
-        current_topic = None
-        current_topic_full = None  # Store full topic name
-        
-        # Process rows
-        for idx, row in df.iterrows():
-            # Check for topic - store FULL name
-            a3_val = clean_text(row.get(col_map.get('A3')))
-            if a3_val:
-                if 'Topic' in a3_val:
-                    # Full topic like "Topic 1 Swastha and Swasthya"
-                    parts = a3_val.split()
-                    if len(parts) >= 2:
-                        current_topic = f"{parts[0]} {parts[1]}"  # "Topic 1"
-                    else:
-                        current_topic = parts[0] if parts else a3_val  # Just "Topic"
-                    current_topic_full = a3_val  # Full name
-                elif a3_val.startswith('CO'):
-                    current_topic = a3_val
-                    if not current_topic_full:
-                        current_topic_full = a3_val
-            
-            # Get learning objective
-            lo = clean_text(row.get(col_map.get('B3')))
-            if not lo or len(lo) < 10:
-                continue
-            if 'learning objective' in lo.lower():
+        for sheet_name, records, error, load_time, parse_time in parse_sheets(
+                excel_path, subjects, workers):
+            code, name, year = subjects[sheet_name]
+            print(f"\n📚 {name} ({code})")
+            if error:
+                print(f"  ⚠️ {error}")
                 continue
+            write_start = time.perf_counter()
             
-            # Parse all fields
-            # C3: Domain
-            c3_raw = clean_text(row.get(col_map.get('C3')))
-            domain_code, domain_full = 'CC', 'Cognitive / Comprehension'
-            if c3_raw:
-                c3_lower = c3_raw.lower()
-                if 'recall' in c3_lower or 'knowledge' in c3_lower:
-                    domain_code, domain_full = 'CK', 'Cognitive / Knowledge'
-                elif 'application' in c3_lower:
-                    domain_code, domain_full = 'CAP', 'Cognitive / Application'
-                elif 'analysis' in c3_lower:
-                    domain_code, domain_full = 'CAN', 'Cognitive / Analysis'
-                elif 'psychomotor' in c3_lower:
-                    domain_code, domain_full = 'PSY-MEC', 'Psychomotor / Mechanism'
-                elif 'affective' in c3_lower:
-                    domain_code, domain_full = 'AFT-RES', 'Affective / Responding'
-            
-            # D3: Priority
-            d3_raw = clean_text(row.get(col_map.get('D3')))
-            priority, priority_full = 'Mk', 'Must know'
-            if d3_raw:
-                if 'Dk' in d3_raw or 'Desirable' in d3_raw:
-                    priority, priority_full = 'Dk', 'Desirable to know'
-                elif 'Nk' in d3_raw or 'Nice' in d3_raw:
-                    priority, priority_full = 'Nk', 'Nice to know'
-            
-            # E3: Competency
-            e3_raw = clean_text(row.get(col_map.get('E3')))
-            comp, comp_full = 'Kh', 'Knows How'
-            if e3_raw:
-                if 'D' == e3_raw or 'Does' in e3_raw:
-                    comp, comp_full = 'D', 'Does'
-                elif 'Sh' in e3_raw or 'Shows' in e3_raw:
-                    comp, comp_full = 'Sh', 'Shows How'
-                elif e3_raw == 'K' or 'Know ' in e3_raw:
-                    comp, comp_full = 'K', 'Knows'
-            
-            # F3: Teaching methods
-            f3_raw = clean_text(row.get(col_map.get('F3')))
-            f3_list = parse_list(f3_raw) if f3_raw else ['Lecture']
-            
-            # G3: Assessment
-            g3_raw = clean_text(row.get(col_map.get('G3')))
-            g3_list = parse_list(g3_raw) if g3_raw else ['Written']
-            
-            # H3: Assessment type
-            h3_raw = clean_text(row.get(col_map.get('H3')))
-            assess_type, assess_type_full = 'F & S', 'Formative & Summative'
-            if h3_raw:
-                if 'S' == h3_raw:
-                    assess_type, assess_type_full = 'S', 'Summative'
-                elif 'F' == h3_raw:
-                    assess_type, assess_type_full = 'F', 'Formative'
+            if incremental:
+                result = sync_sheet(conn, sheet_name, code, records)
+                if result is None:
+                    print(f"  ⏭️ Unchanged, skipped (load {load_time:.2f}s, parse {parse_time:.2f}s)")
+                    continue
+                count, updated, deactivated, sheet_rejects = result
+                print(f"  🔄 {updated} updated, {deactivated} marked inactive")
+            else:
+                count, sheet_rejects = write_sheet(conn, records)
+            for idx, error in sheet_rejects:
+                print(f"  Error row {idx}: {error}")
+            rejects.extend((sheet_name, idx, error) for idx, error in sheet_rejects)
             
-            # I3: Term
-            i3_raw = clean_text(row.get(col_map.get('I3')))
-            term = i3_raw if i3_raw in ['I', 'II', 'III'] else 'I'
-            
-            # J3: Integration
-            j3_raw = clean_text(row.get(col_map.get('J3')))
-            j3_list = parse_list(j3_raw) if j3_raw else []
-            
-            # Insert
-            try:
-                cursor.execute('''
-                    INSERT INTO syllabus_master (
-                        subject_code, subject_name, year, topic_number,
-                        learning_objective_text,
-                        domain_code, domain_full,
-                        priority_level, priority_full,
-                        competency_level, competency_full,
-                        teaching_methods_codes, teaching_methods_full,
-                        assessment_methods_codes, assessment_methods_full,
-                        assessment_type, assessment_type_full,
-                        term, integration_codes, integration_full,
-                        course_outcome, programme_outcome
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    code, name, year, current_topic_full or 'Topic 1',
-                    lo,
-                    domain_code, domain_full,
-                    priority, priority_full,
-                    comp, comp_full,
-                    json.dumps(f3_list[:3]), json.dumps(f3_list[:3]),
-                    json.dumps(g3_list[:3]), json.dumps(g3_list[:3]),
-                    assess_type, assess_type_full,
-                    term, json.dumps(j3_list), json.dumps(j3_list),
-                    current_topic or 'CO 1', 'PO1, PO2'
-                ))
-                count += 1
-            except Exception as e:
-                print(f"  Error row {idx}: {e}")
-        
-        print(f"  ✅ Imported {count} SLOs")
-        total_imported += count
+            print(f"  ✅ Imported {count} SLOs (load {load_time:.2f}s, parse {parse_time:.2f}s, "
+                  f"write {time.perf_counter() - write_start:.2f}s)")
+            total_imported += count
+    finally:
+        # An interrupted sheet leaves its transaction open; pragmas need it closed
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        for name, value in saved_pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        conn.close()
     
-    conn.commit()
-    conn.close()
+    # Priorities, terms or status of already-covered SLOs may have changed
+    db.rebuild_coverage_summary()
+    db.rebuild_term_index()
+    db.rebuild_topics()
+    db.bump_syllabus_version()
     
     print(f"\n{'='*60}")
-    print(f"✅ TOTAL IMPORTED: {total_imported} SLOs")
+    if rejects:
+        print(f"⚠️ REJECTED: {len(rejects)} rows")
+    print(f"✅ TOTAL IMPORTED: {total_imported} SLOs in {time.perf_counter() - run_start:.2f}s")
     print(f"{'='*60}\n")
     
     return total_imported
 
+def build_snapshot(excel_path, snapshot_path=SNAPSHOT_PATH, workers=None):
+    """Build the compressed, read-only syllabus snapshot the app loads at startup
+
+    The workbook is imported into a scratch database, tagged with the
+    snapshot format and the workbook's SHA-1, vacuumed and gzipped.
+    Returns the number of SLOs in the snapshot.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'snapshot.db')
+        total = import_excel(excel_path, Database(db_path), incremental=True, workers=workers)
+        
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE snapshot_meta (key TEXT PRIMARY KEY, value TEXT)')
+        conn.executemany('INSERT INTO snapshot_meta VALUES (?, ?)', [
+            ('format', str(SNAPSHOT_FORMAT)),
+            ('workbook_sha1', file_sha1(excel_path)),
+            ('built_at', datetime.now().isoformat(timespec='seconds')),
+            ('slo_count', str(total)),
+        ])
+        conn.commit()
+        conn.execute('VACUUM')
+        conn.close()
+        
+        with open(db_path, 'rb') as src, gzip.GzipFile(snapshot_path, 'wb', mtime=0) as dst:
+            shutil.copyfileobj(src, dst)
+    
+    print(f"✅ Snapshot written: {snapshot_path} ({os.path.getsize(snapshot_path) // 1024} KB)")
+    return total
+
 if __name__ == "__main__":
     print("AYURVEDA TEACHER'S APP - DATA IMPORT")
     print("="*60)
     
     db = Database()
     
+    # Re-running syncs against the existing rows instead of appending duplicates
+    incremental = '--full' not in sys.argv
+    # Parse sheets on every core with --parallel (worth it for large workbooks)
+    workers = os.cpu_count() if '--parallel' in sys.argv else None
+    
     # UPDATE THIS PATH TO YOUR EXCEL FILE
     excel_path = r'D:\SKAMC\LMS\syllabus_data\LMS_All_Sheets_Combined.xlsx'
     
-    if not os.path.exists(excel_path):
+    if '--rebuild-coverage' in sys.argv:
+        # Repair the coverage_summary counters from the coverage log
+        db.rebuild_coverage_summary()
+        print("✅ Coverage summary rebuilt")
+    elif not os.path.exists(excel_path):
         print(f"❌ Excel file not found: {excel_path}")
         print("\nPlease update the excel_path in this script!")
         input("Press Enter to exit...")
+    elif '--snapshot' in sys.argv:
+        # Build the artifact to commit next to app.py for fast cold starts
+        build_snapshot(excel_path, workers=workers)
+        input("\nPress Enter to exit...")
     else:
-        total = import_excel(excel_path, db)
+        total = import_excel(excel_path, db, incremental=incremental, workers=workers)
         print(f"\n✅ SUCCESS! {total} SLOs imported")
         print("\nRun: streamlit run app.py")
         input("\nPress Enter to exit...")
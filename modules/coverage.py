@@ -30,7 +30,15 @@ def show(db, teacher_id, academic_year):
         st.markdown("---")
         st.markdown("### By Priority")
         for pri, data in stats['by_priority'].items():
-            pct = round((data['covered'] / data['total'] * 100) if data['total'] > 0 else 0, 1)
+            pct = data['percentage']
             icons = {'Mk': '🔴', 'Dk': '🟡', 'Nk': '🟢'}
             st.markdown(f"{icons.get(pri, '⚪')} **{pri}:** {data['covered']}/{data['total']} ({pct}%)")
             st.progress(pct / 100)
+    
+    if stats.get('by_term'):
+        st.markdown("---")
+        st.markdown("### By Term")
+        for term, data in stats['by_term'].items():
+            pct = data['percentage']
+            st.markdown(f"📅 **Term {term}:** {data['covered']}/{data['total']} ({pct}%)")
+            st.progress(pct / 100)
@@ -10,11 +10,7 @@ def show(db, teacher_id, academic_year):
     if not selected_code:
         st.warning("No subject selected.")
         # Show total database info
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM syllabus_master")
-        total = cursor.fetchone()[0]
-        conn.close()
+        total = db.count_slos(active_only=True)
         st.success(f"📚 {total:,} SLOs available in database")
         return
     
@@ -48,7 +44,7 @@ def show(db, teacher_id, academic_year):
         st.markdown("### Progress by Priority")
         
         for pri, data in stats['by_priority'].items():
-            pct = round((data['covered'] / data['total'] * 100) if data['total'] > 0 else 0, 1)
+            pct = data['percentage']
             
             icons = {'Mk': '🔴', 'Dk': '🟡', 'Nk': '🟢'}
             names = {'Mk': 'Must Know', 'Dk': 'Desirable', 'Nk': 'Nice to Know'}
@@ -1,47 +1,1208 @@
 """
 Database Module for Ayurveda Teacher's Syllabus Management App
-Handles all database operations using SQLite
+Handles all database operations using SQLite (or PostgreSQL, see StorageBackend)
 FIXED VERSION - Windows Compatible
 """
 
 import sqlite3
+import gzip
+import hashlib
 import json
+import math
 import os
+import pathlib
+import queue
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-import pandas as pd
+from functools import lru_cache, wraps
+from typing import Iterator, List, Dict, Optional, Tuple
 
-class Database:
-    def __init__(self, db_path=None):
-        """Initialize database with auto-path creation"""
-        # Auto-create database path if not provided
-        if db_path is None:
-            # Get the directory where this script is located
+from query_monitor import DEFAULT_SLOW_MS, QueryMonitor
+from transliteration import highlight, text_terms, trigrams
+
+# SQLite file used when neither a db_path nor DATABASE_URL is given
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'data', 'ayurveda_syllabus.db')
+
+# Bump when the snapshot layout changes; older snapshots are then ignored
+SNAPSHOT_FORMAT = 3
+
+# Tables copied from a snapshot: the syllabus plus everything derived from
+# it, so a cold start does not rebuild the search index or topics
+SNAPSHOT_TABLES = ('syllabus_master', 'syllabus_import_sheets', 'syllabus_terms',
+                   'syllabus_term_vocab', 'syllabus_term_trigrams', 'topics', 'topic_terms')
+
+# Syllabus query results kept in memory per process (LRU beyond this)
+SYLLABUS_CACHE_SIZE = 64
+
+# Retries when another process holds the write lock past busy_timeout:
+# attempts and the first delay in seconds (doubled per attempt, jittered)
+BUSY_RETRIES = 6
+BUSY_BACKOFF_S = 0.05
+
+# Most queued write jobs the writer thread commits in one transaction
+WRITE_BATCH_SIZE = 64
+
+# Longest a caller waits for its write job (busy retries included) before giving up
+WRITE_TIMEOUT_S = 60
+
+# Prepared statements kept per connection (sqlite3 cached_statements,
+# psycopg prepared_max). Queries live in Database methods with fixed SQL
+# text, so each one is parsed once per connection and then reused.
+STATEMENT_CACHE_SIZE = 256
+
+# Rows fetched from the cursor per round trip when streaming exports
+EXPORT_CHUNK_ROWS = 1000
+
+# Recomputes coverage_summary from the log (migration 5 and repairs)
+COVERAGE_SUMMARY_REBUILD_SQL = '''
+    INSERT INTO coverage_summary (teacher_id, subject_code, priority_level, term,
+                                  domain_code, competency_level, covered)
+    SELECT scl.teacher_id, sm.subject_code, COALESCE(sm.priority_level, ''),
+           COALESCE(sm.term, ''), COALESCE(sm.domain_code, ''),
+           COALESCE(sm.competency_level, ''), COUNT(DISTINCT sm.syllabus_id)
+    FROM syllabus_coverage_log scl
+    JOIN syllabus_master sm ON scl.syllabus_id = sm.syllabus_id
+    WHERE sm.status = 'active'
+    GROUP BY scl.teacher_id, sm.subject_code, sm.priority_level, sm.term,
+             sm.domain_code, sm.competency_level
+'''
+
+# Completed SLOs of a teacher and subject with start <= coverage_date < end.
+# Plain range predicates (no strftime) let idx_coverage_teacher_subject seek
+# straight to the range and return it already in date order.
+COVERAGE_BETWEEN_SQL = '''
+    SELECT sm.*, scl.coverage_date
+    FROM syllabus_coverage_log scl
+    JOIN syllabus_master sm ON scl.syllabus_id = sm.syllabus_id
+    WHERE scl.teacher_id = ? AND scl.subject_code = ?
+    AND scl.coverage_date >= ? AND scl.coverage_date < ?
+    ORDER BY scl.coverage_date
+'''
+
+# Completed SLOs of one teacher and subject, newest first (Export Reports)
+COMPLETED_SQL = '''
+    SELECT sm.*, scl.coverage_date
+    FROM syllabus_coverage_log scl
+    JOIN syllabus_master sm ON scl.syllabus_id = sm.syllabus_id
+    WHERE scl.teacher_id = ? AND scl.subject_code = ? {term_filter}
+    ORDER BY scl.coverage_date DESC
+'''
+
+# Schema migrations, applied in order on top of create_tables.
+# PRAGMA user_version holds the last applied version. Each migration names
+# a representative app query and the index its plan must use afterwards;
+# the plan before and after is printed when the migration runs.
+MIGRATIONS = [
+    {
+        'version': 1,
+        'description': 'Index syllabus lookups by subject, status, term and priority',
+        'statements': [
+            '''CREATE INDEX IF NOT EXISTS idx_syllabus_subject
+               ON syllabus_master (subject_code, status, term, priority_level)''',
+        ],
+        'check': ('''SELECT * FROM syllabus_master
+                     WHERE subject_code = ? AND status = 'active' AND term = ?''',
+                  ('AyUG-KS', 'I')),
+        'expect': 'idx_syllabus_subject',
+    },
+    {
+        'version': 2,
+        'description': 'Index the coverage log by teacher, subject and date',
+        'statements': [
+            '''CREATE INDEX IF NOT EXISTS idx_coverage_teacher_subject
+               ON syllabus_coverage_log (teacher_id, subject_code, coverage_date)''',
+        ],
+        'check': ('''SELECT COUNT(DISTINCT syllabus_id) FROM syllabus_coverage_log
+                     WHERE teacher_id = ? AND subject_code = ?
+                     AND coverage_date >= ? AND coverage_date < ?''',
+                  (1, 'AyUG-KS', '2025-06-01', '2025-07-01')),
+        'expect': 'idx_coverage_teacher_subject',
+    },
+    {
+        'version': 3,
+        'description': 'Index coverage per teacher and SLO for syllabus joins',
+        'statements': [
+            '''CREATE INDEX IF NOT EXISTS idx_coverage_teacher_slo
+               ON syllabus_coverage_log (teacher_id, syllabus_id)''',
+        ],
+        'check': ('''SELECT sm.priority_level, COUNT(DISTINCT scl.syllabus_id)
+                     FROM syllabus_master sm
+                     LEFT JOIN syllabus_coverage_log scl
+                         ON sm.syllabus_id = scl.syllabus_id AND scl.teacher_id = ?
+                     WHERE sm.subject_code = ? AND sm.status = 'active'
+                     GROUP BY sm.priority_level''',
+                  (1, 'AyUG-KS')),
+        'expect': 'idx_coverage_teacher_slo',
+    },
+    {
+        'version': 4,
+        'description': 'Index planned SLOs by teacher, subject and plan type',
+        'statements': [
+            '''CREATE INDEX IF NOT EXISTS idx_planned_teacher_subject
+               ON planned_slos (teacher_id, subject_code, plan_type, plan_date)''',
+        ],
+        'check': ('''SELECT ps.*, sm.learning_objective_text, sm.topic_number
+                     FROM planned_slos ps
+                     JOIN syllabus_master sm ON ps.syllabus_id = sm.syllabus_id
+                     WHERE ps.teacher_id = ? AND ps.subject_code = ? AND ps.plan_type = ?
+                     ORDER BY ps.plan_date DESC''',
+                  (1, 'AyUG-KS', 'today')),
+        'expect': 'idx_planned_teacher_subject',
+    },
+    {
+        'version': 5,
+        'description': 'Materialize per-teacher coverage counts, kept current by triggers',
+        'statements': [
+            '''CREATE TABLE IF NOT EXISTS coverage_summary (
+                   teacher_id INTEGER NOT NULL,
+                   subject_code TEXT NOT NULL,
+                   priority_level TEXT NOT NULL DEFAULT '',
+                   term TEXT NOT NULL DEFAULT '',
+                   domain_code TEXT NOT NULL DEFAULT '',
+                   competency_level TEXT NOT NULL DEFAULT '',
+                   covered INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (teacher_id, subject_code, priority_level, term,
+                                domain_code, competency_level)
+               ) WITHOUT ROWID''',
+            # First log row for a (teacher, SLO) pair covers the SLO
+            '''CREATE TRIGGER IF NOT EXISTS trg_coverage_log_insert
+               AFTER INSERT ON syllabus_coverage_log
+               WHEN (SELECT COUNT(*) FROM syllabus_coverage_log
+                     WHERE teacher_id = NEW.teacher_id AND syllabus_id = NEW.syllabus_id) = 1
+               BEGIN
+                   INSERT INTO coverage_summary (teacher_id, subject_code, priority_level, term,
+                                                 domain_code, competency_level, covered)
+                   SELECT NEW.teacher_id, sm.subject_code, COALESCE(sm.priority_level, ''),
+                          COALESCE(sm.term, ''), COALESCE(sm.domain_code, ''),
+                          COALESCE(sm.competency_level, ''), 1
+                   FROM syllabus_master sm
+                   WHERE sm.syllabus_id = NEW.syllabus_id AND sm.status = 'active'
+                   ON CONFLICT DO UPDATE SET covered = covered + 1;
+               END''',
+            # Removing the last log row for a (teacher, SLO) pair uncovers it
+            '''CREATE TRIGGER IF NOT EXISTS trg_coverage_log_delete
+               AFTER DELETE ON syllabus_coverage_log
+               WHEN NOT EXISTS (SELECT 1 FROM syllabus_coverage_log
+                                WHERE teacher_id = OLD.teacher_id AND syllabus_id = OLD.syllabus_id)
+               BEGIN
+                   UPDATE coverage_summary SET covered = covered - 1
+                   WHERE (teacher_id, subject_code, priority_level, term,
+                          domain_code, competency_level) IN (
+                       SELECT OLD.teacher_id, sm.subject_code, COALESCE(sm.priority_level, ''),
+                              COALESCE(sm.term, ''), COALESCE(sm.domain_code, ''),
+                              COALESCE(sm.competency_level, '')
+                       FROM syllabus_master sm
+                       WHERE sm.syllabus_id = OLD.syllabus_id AND sm.status = 'active'
+                   );
+               END''',
+            COVERAGE_SUMMARY_REBUILD_SQL,
+        ],
+        # Same table and triggers for PostgreSQL, whose triggers call functions
+        'postgres_statements': [
+            '''CREATE TABLE IF NOT EXISTS coverage_summary (
+                   teacher_id INTEGER NOT NULL,
+                   subject_code TEXT NOT NULL,
+                   priority_level TEXT NOT NULL DEFAULT '',
+                   term TEXT NOT NULL DEFAULT '',
+                   domain_code TEXT NOT NULL DEFAULT '',
+                   competency_level TEXT NOT NULL DEFAULT '',
+                   covered INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (teacher_id, subject_code, priority_level, term,
+                                domain_code, competency_level)
+               )''',
+            '''CREATE OR REPLACE FUNCTION coverage_log_insert() RETURNS trigger AS $$
+               BEGIN
+                   IF (SELECT COUNT(*) FROM syllabus_coverage_log
+                       WHERE teacher_id = NEW.teacher_id AND syllabus_id = NEW.syllabus_id) = 1 THEN
+                       INSERT INTO coverage_summary (teacher_id, subject_code, priority_level, term,
+                                                     domain_code, competency_level, covered)
+                       SELECT NEW.teacher_id, sm.subject_code, COALESCE(sm.priority_level, ''),
+                              COALESCE(sm.term, ''), COALESCE(sm.domain_code, ''),
+                              COALESCE(sm.competency_level, ''), 1
+                       FROM syllabus_master sm
+                       WHERE sm.syllabus_id = NEW.syllabus_id AND sm.status = 'active'
+                       ON CONFLICT (teacher_id, subject_code, priority_level, term,
+                                    domain_code, competency_level)
+                       DO UPDATE SET covered = coverage_summary.covered + 1;
+                   END IF;
+                   RETURN NULL;
+               END $$ LANGUAGE plpgsql''',
+            '''CREATE OR REPLACE TRIGGER trg_coverage_log_insert
+               AFTER INSERT ON syllabus_coverage_log
+               FOR EACH ROW EXECUTE FUNCTION coverage_log_insert()''',
+            '''CREATE OR REPLACE FUNCTION coverage_log_delete() RETURNS trigger AS $$
+               BEGIN
+                   IF NOT EXISTS (SELECT 1 FROM syllabus_coverage_log
+                                  WHERE teacher_id = OLD.teacher_id AND syllabus_id = OLD.syllabus_id) THEN
+                       UPDATE coverage_summary SET covered = covered - 1
+                       WHERE (teacher_id, subject_code, priority_level, term,
+                              domain_code, competency_level) IN (
+                           SELECT OLD.teacher_id, sm.subject_code, COALESCE(sm.priority_level, ''),
+                                  COALESCE(sm.term, ''), COALESCE(sm.domain_code, ''),
+                                  COALESCE(sm.competency_level, '')
+                           FROM syllabus_master sm
+                           WHERE sm.syllabus_id = OLD.syllabus_id AND sm.status = 'active'
+                       );
+                   END IF;
+                   RETURN NULL;
+               END $$ LANGUAGE plpgsql''',
+            '''CREATE OR REPLACE TRIGGER trg_coverage_log_delete
+               AFTER DELETE ON syllabus_coverage_log
+               FOR EACH ROW EXECUTE FUNCTION coverage_log_delete()''',
+            COVERAGE_SUMMARY_REBUILD_SQL,
+        ],
+        'check': ('''SELECT * FROM coverage_summary WHERE teacher_id = ? AND subject_code = ?''',
+                  (1, 'AyUG-KS')),
+        'expect': 'PRIMARY KEY',
+    },
+    {
+        'version': 6,
+        'description': 'Add app_meta with a syllabus version counter for cache invalidation',
+        'statements': [
+            '''CREATE TABLE IF NOT EXISTS app_meta (
+                   key TEXT PRIMARY KEY,
+                   value INTEGER NOT NULL
+               )''',
+            '''INSERT INTO app_meta (key, value) VALUES ('syllabus_version', 0)
+               ON CONFLICT DO NOTHING''',
+        ],
+        'check': ('''SELECT value FROM app_meta WHERE key = ?''', ('syllabus_version',)),
+        'expect': 'sqlite_autoindex_app_meta_1',
+    },
+    {
+        'version': 7,
+        'description': 'Full-text index over learning objectives and topics (FTS5)',
+        # SQLite builds without FTS5 skip this; search_syllabus then uses fuzzy search
+        'optional': True,
+        'postgres_statements': [],
+        'statements': [
+            '''CREATE VIRTUAL TABLE IF NOT EXISTS syllabus_fts USING fts5(
+                   learning_objective_text, topic_number,
+                   content = 'syllabus_master', content_rowid = 'syllabus_id',
+                   tokenize = 'unicode61 remove_diacritics 2'
+               )''',
+            '''CREATE TRIGGER IF NOT EXISTS trg_syllabus_fts_insert
+               AFTER INSERT ON syllabus_master
+               BEGIN
+                   INSERT INTO syllabus_fts (rowid, learning_objective_text, topic_number)
+                   VALUES (NEW.syllabus_id, NEW.learning_objective_text, NEW.topic_number);
+               END''',
+            '''CREATE TRIGGER IF NOT EXISTS trg_syllabus_fts_delete
+               AFTER DELETE ON syllabus_master
+               BEGIN
+                   INSERT INTO syllabus_fts (syllabus_fts, rowid, learning_objective_text, topic_number)
+                   VALUES ('delete', OLD.syllabus_id, OLD.learning_objective_text, OLD.topic_number);
+               END''',
+            '''CREATE TRIGGER IF NOT EXISTS trg_syllabus_fts_update
+               AFTER UPDATE OF learning_objective_text, topic_number ON syllabus_master
+               BEGIN
+                   INSERT INTO syllabus_fts (syllabus_fts, rowid, learning_objective_text, topic_number)
+                   VALUES ('delete', OLD.syllabus_id, OLD.learning_objective_text, OLD.topic_number);
+                   INSERT INTO syllabus_fts (rowid, learning_objective_text, topic_number)
+                   VALUES (NEW.syllabus_id, NEW.learning_objective_text, NEW.topic_number);
+               END''',
+            '''INSERT INTO syllabus_fts (syllabus_fts) VALUES ('rebuild')''',
+        ],
+        'check': ('''SELECT rowid FROM syllabus_fts WHERE syllabus_fts MATCH ?''', ('prakriti',)),
+        'expect': 'VIRTUAL TABLE',
+    },
+    {
+        'version': 8,
+        'description': 'Transliteration-aware term and trigram index for fuzzy search',
+        'statements': [
+            # Folded term (see transliteration.term_key) -> SLOs containing it
+            '''CREATE TABLE IF NOT EXISTS syllabus_terms (
+                   term TEXT NOT NULL,
+                   syllabus_id INTEGER NOT NULL,
+                   PRIMARY KEY (term, syllabus_id)
+               ) WITHOUT ROWID''',
+            '''CREATE TABLE IF NOT EXISTS syllabus_term_vocab (
+                   term TEXT PRIMARY KEY,
+                   doc_count INTEGER NOT NULL,
+                   trigram_count INTEGER NOT NULL
+               ) WITHOUT ROWID''',
+            '''CREATE TABLE IF NOT EXISTS syllabus_term_trigrams (
+                   trigram TEXT NOT NULL,
+                   term TEXT NOT NULL,
+                   PRIMARY KEY (trigram, term)
+               ) WITHOUT ROWID''',
+        ],
+        # Filled from Python; rebuilt after every syllabus import
+        'populate': '_fill_term_index',
+        'check': ('''SELECT term FROM syllabus_term_trigrams WHERE trigram IN (?, ?)''',
+                  ('$va', 'vat')),
+        'expect': 'PRIMARY KEY',
+    },
+    {
+        'version': 9,
+        'description': 'Precomputed topic list and per-topic priority counts per subject',
+        'statements': [
+            # One row per topic_number of a subject, in workbook order
+            '''CREATE TABLE IF NOT EXISTS topics (
+                   subject_code TEXT NOT NULL,
+                   topic_id INTEGER NOT NULL,
+                   topic_number TEXT,
+                   display_name TEXT NOT NULL,
+                   terms TEXT NOT NULL,
+                   slo_count INTEGER NOT NULL,
+                   mk_count INTEGER NOT NULL,
+                   dk_count INTEGER NOT NULL,
+                   nk_count INTEGER NOT NULL,
+                   PRIMARY KEY (subject_code, topic_id)
+               ) WITHOUT ROWID''',
+            # The same counts restricted to one term
+            '''CREATE TABLE IF NOT EXISTS topic_terms (
+                   subject_code TEXT NOT NULL,
+                   term TEXT NOT NULL,
+                   topic_id INTEGER NOT NULL,
+                   slo_count INTEGER NOT NULL,
+                   mk_count INTEGER NOT NULL,
+                   dk_count INTEGER NOT NULL,
+                   nk_count INTEGER NOT NULL,
+                   PRIMARY KEY (subject_code, term, topic_id)
+               ) WITHOUT ROWID''',
+        ],
+        # Filled from Python; rebuilt after every syllabus import
+        'populate': '_fill_topics',
+        'check': ('''SELECT t.*, tt.slo_count FROM topic_terms tt
+                     JOIN topics t ON t.subject_code = tt.subject_code AND t.topic_id = tt.topic_id
+                     WHERE tt.subject_code = ? AND tt.term = ?''', ('AyUG-KS', 'I')),
+        'expect': 'PRIMARY KEY',
+    },
+    {
+        'version': 10,
+        'description': 'Compact duplicate coverage rows and make coverage events unique',
+        'statements': [
+            # Keep the earliest row of each teacher/SLO/category, drop repeat clicks
+            '''DELETE FROM syllabus_coverage_log WHERE log_id IN (
+                   SELECT log_id FROM (
+                       SELECT log_id, ROW_NUMBER() OVER (
+                           PARTITION BY teacher_id, syllabus_id, COALESCE(category, '')
+                           ORDER BY coverage_date, log_id) as n
+                       FROM syllabus_coverage_log) AS ranked
+                   WHERE n > 1)''',
+            # COALESCE: plain UNIQUE treats NULL categories as all distinct,
+            # which would leave ON CONFLICT DO NOTHING adding duplicates
+            '''CREATE UNIQUE INDEX IF NOT EXISTS idx_coverage_unique_event
+               ON syllabus_coverage_log (teacher_id, syllabus_id, COALESCE(category, ''))''',
+            # Its (teacher_id, syllabus_id) prefix serves migration 3's lookups
+            '''DROP INDEX IF EXISTS idx_coverage_teacher_slo''',
+        ],
+        'check': ('''SELECT COUNT(*) FROM syllabus_coverage_log
+                     WHERE teacher_id = ? AND syllabus_id = ?''', (1, 1)),
+        'expect': 'idx_coverage_unique_event',
+    },
+]
+
+# Fuzzy search: minimum trigram (Dice) similarity for a term to match
+FUZZY_MIN_SIMILARITY = 0.5
+
+# topic_number values that are exam instructions, notes or pasted tables
+# rather than topic headings; their SLOs are listed as "Other SLOs"
+JUNK_TOPIC_MARKERS = ('Q3 LAQ', 'Must know', 'Evaluation Method', 'Note:', '|')
+
+def topic_display_name(topic_number: Optional[str]) -> Optional[str]:
+    """Clean display name for a topic_number, or None if it is not a heading"""
+    name = ' '.join((topic_number or '').split())
+    if not name:
+        return 'General'
+    if len(name) > 80 or any(marker in name for marker in JUNK_TOPIC_MARKERS):
+        return None
+    name = re.sub(r'^Topic\s*-\s*(?=\d)', 'Topic ', name)  # Topic-12
+    return re.sub(r'^Topic\s*-\s*', 'Topic: ', name)     # Topic- Joints
+
+def month_range(year: int, month: int) -> Tuple[str, str]:
+    """Half-open [first day, first day of next month) bounds for COVERAGE_BETWEEN_SQL"""
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f'{year:04d}-{month:02d}-01', f'{next_year:04d}-{next_month:02d}-01'
+
+def explain_query_plan(conn, query: str, params=()) -> List[str]:
+    """The detail lines of EXPLAIN QUERY PLAN for a query"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+
+def iter_cursor(cursor) -> Iterator[tuple]:
+    """Yield the column names of an executed cursor, then its rows in chunks"""
+    yield tuple(column[0] for column in cursor.description)
+    while True:
+        rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            break
+        for row in rows:
+            yield tuple(row)
+
+def timed(method):
+    """Count calls and time spent per Database method (see query_stats)"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        monitor = self.monitor
+        start = time.perf_counter()
+        try:
+            if monitor is None:
+                return method(self, *args, **kwargs)
+            with monitor.method(method.__name__):
+                return method(self, *args, **kwargs)
+        finally:
+            self._record_timing(method.__name__, time.perf_counter() - start)
+    return wrapper
+
+def file_sha1(path: str) -> str:
+    """SHA-1 of a file's bytes (used to tie a snapshot to its workbook)"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class SLORecord:
+    """One syllabus_master row with its JSON list columns decoded once
+
+    Built when the syllabus is loaded and shared through the syllabus
+    cache, so render loops read teaching_methods, assessment_methods and
+    integrations directly instead of calling json.loads per SLO. Supports
+    dict-style access (slo['term'], slo.get('topic_number')) as well.
+    """
+    
+    COLUMNS = (
+        'syllabus_id', 'subject_code', 'subject_name', 'year', 'paper_number', 'part',
+        'topic_number', 'topic_name', 'learning_objective_id', 'learning_objective_text',
+        'domain_code', 'domain_full', 'priority_level', 'priority_full',
+        'competency_level', 'competency_full',
+        'teaching_methods_codes', 'teaching_methods_full',
+        'assessment_methods_codes', 'assessment_methods_full',
+        'assessment_type', 'assessment_type_full', 'term',
+        'lecture_hours', 'non_lecture_hours_theory', 'non_lecture_hours_practical',
+        'course_outcome', 'programme_outcome', 'integration_codes', 'integration_full',
+        'marks_weightage', 'mcq_allowed', 'saq_allowed', 'laq_allowed', 'status',
+        'slo_key', 'content_hash', 'created_at', 'updated_at',
+    )
+    # Decoded list field -> JSON text column it comes from
+    LIST_FIELDS = {
+        'teaching_methods': 'teaching_methods_codes',
+        'assessment_methods': 'assessment_methods_codes',
+        'integrations': 'integration_codes',
+    }
+    __slots__ = COLUMNS + tuple(LIST_FIELDS)
+    
+    def __init__(self, row: sqlite3.Row):
+        keys = row.keys()
+        for column in self.COLUMNS:
+            setattr(self, column, row[column] if column in keys else None)
+        for field, column in self.LIST_FIELDS.items():
+            setattr(self, field, self._decode_list(getattr(self, column)))
+    
+    @staticmethod
+    def _decode_list(text) -> Tuple[str, ...]:
+        if not text:
+            return ()
+        try:
+            value = json.loads(text)
+        except (TypeError, ValueError):
+            return ()
+        return tuple(value) if isinstance(value, list) else ()
+    
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+    
+    def as_dict(self) -> Dict:
+        """Plain dict of the database columns (e.g. for DataFrames)"""
+        return {column: getattr(self, column) for column in self.COLUMNS}
+
+def is_busy_error(error: Exception) -> bool:
+    """True for SQLITE_BUSY / SQLITE_LOCKED ('database is locked') errors"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+def retry_busy(action, is_busy=is_busy_error, retries: int = BUSY_RETRIES,
+               backoff: float = BUSY_BACKOFF_S):
+    """Return action(), retrying with exponential backoff while the database is busy"""
+    for attempt in range(retries + 1):
+        try:
+            return action()
+        except Exception as e:
+            if attempt == retries or not is_busy(e):
+                raise
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+class StorageBackend:
+    """Where the tables live: pooled connections plus engine-specific hooks
+    
+    Database is written in SQLite's SQL dialect against the sqlite3
+    connection API. A backend hands out connections that accept it and
+    answers the few questions that differ by engine (schema version,
+    column lists, query plans, which errors mean "busy, retry").
+    
+    Streamlit reruns each script in a worker thread; instead of paying
+    connect/close on every query, a thread checks a connection out for the
+    duration of a `with` block and returns it afterwards. Nested blocks on
+    the same thread reuse the connection they are already holding.
+    """
+    
+    name = None
+    # Statement opening a write transaction (WriteQueue)
+    begin_write = 'BEGIN'
+    # FTS5 index for search_syllabus; without it search goes straight to fuzzy
+    full_text_search = False
+    # DB-API base exception of the driver
+    Error = Exception
+    # QueryMonitor wrapping checked-out connections (Database.enable_monitoring)
+    monitor = None
+    
+    def __init__(self, max_idle: int = 8):
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+    
+    def connect(self):
+        """Open a new configured connection (not managed by the pool)"""
+        raise NotImplementedError
+    
+    def connect_read_only(self):
+        """Open a connection that refuses writes (report workers)"""
+        raise NotImplementedError
+    
+    def is_usable(self, conn) -> bool:
+        """Whether a checked-in connection may be handed out again"""
+        return True
+    
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commit on success, roll back on error"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+        
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        monitored = self.monitor.wrap(conn, self) if self.monitor else None
+        self._local.conn = monitored or conn
+        try:
+            yield monitored or conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if monitored:
+                monitored.detach()
+            self._local.conn = None
+            if self._idle.qsize() < self.max_idle and self.is_usable(conn):
+                self._idle.put(conn)
+            else:
+                conn.close()
+    
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
             try:
-                base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            except:
-                base_dir = os.getcwd()
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+    
+    def is_busy_error(self, error: Exception) -> bool:
+        """True when error means another writer holds a lock (worth retrying)"""
+        return False
+    
+    def get_schema_version(self, conn) -> int:
+        """Last migration version applied (see MIGRATIONS)"""
+        raise NotImplementedError
+    
+    def set_schema_version(self, conn, version: int):
+        raise NotImplementedError
+    
+    def table_columns(self, conn, table: str) -> List[str]:
+        """Column names of a table"""
+        raise NotImplementedError
+    
+    def explain(self, conn, query: str, params=()) -> List[str]:
+        """Query plan lines, for migration reports"""
+        raise NotImplementedError
+
+def remove_database_files(path: str):
+    """Delete a SQLite file with its WAL and shared-memory files"""
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+class SQLiteBackend(StorageBackend):
+    """A single SQLite file in WAL mode (the default)
+    
+    db_path ':memory:' gives a private throwaway database for tests. It is
+    a temporary file deleted with the backend, not a shared-cache memory
+    database: those take table locks that ignore busy_timeout, so
+    concurrent readers and the writer would fail with "table is locked"
+    where a real database file just waits.
+    """
+    
+    name = 'sqlite'
+    begin_write = 'BEGIN IMMEDIATE'
+    full_text_search = True
+    Error = sqlite3.Error
+    
+    def __init__(self, db_path: str, max_idle: int = 8, busy_timeout_ms: int = 5000,
+                 cached_statements: int = STATEMENT_CACHE_SIZE):
+        super().__init__(max_idle)
+        if db_path == ':memory:':
+            fd, db_path = tempfile.mkstemp(prefix='ayurveda-', suffix='.db')
+            os.close(fd)
+            weakref.finalize(self, remove_database_files, db_path)
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+    
+    def connect(self) -> sqlite3.Connection:
+        """Open a new configured connection (not managed by the pool)"""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {self.busy_timeout_ms}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+    
+    def connect_read_only(self) -> sqlite3.Connection:
+        """Read-only connection (mode=ro, query_only)"""
+        uri = pathlib.Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout_ms / 1000)
+        conn.execute('PRAGMA query_only = 1')
+        return conn
+    
+    def is_busy_error(self, error: Exception) -> bool:
+        return is_busy_error(error)
+    
+    def get_schema_version(self, conn) -> int:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    
+    def set_schema_version(self, conn, version: int):
+        conn.execute(f'PRAGMA user_version = {int(version)}')
+    
+    def table_columns(self, conn, table: str) -> List[str]:
+        return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    
+    def explain(self, conn, query: str, params=()) -> List[str]:
+        return explain_query_plan(conn, query, params)
+
+# SQLite-dialect constructs and their PostgreSQL spelling (see postgres_sql)
+POSTGRES_REWRITES = [
+    (re.compile(r'INTEGER PRIMARY KEY AUTOINCREMENT', re.I),
+     'INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY'),
+    (re.compile(r'\)\s*WITHOUT ROWID', re.I), ')'),
+    (re.compile(r'^\s*BEGIN IMMEDIATE\s*$', re.I), 'BEGIN'),
+    (re.compile(r'\bIS\s+\?', re.I), 'IS NOT DISTINCT FROM ?'),
+]
+# A quoted string literal, or a ? placeholder outside one
+SQL_LITERAL_OR_PLACEHOLDER = re.compile(r"'(?:[^']|'')*'|\?")
+
+# SQLSTATEs of lock timeouts, serialization failures and deadlocks
+POSTGRES_BUSY_SQLSTATES = {'55P03', '40001', '40P01'}
+
+@lru_cache(maxsize=1024)
+def postgres_sql(query: str, with_params: bool = True) -> str:
+    """Translate a SQLite-dialect statement for psycopg
+    
+    Applies POSTGRES_REWRITES; with parameters, ? becomes %s and a literal
+    % is doubled (psycopg leaves statements without parameters alone).
+    """
+    for pattern, replacement in POSTGRES_REWRITES:
+        query = pattern.sub(replacement, query)
+    if not with_params:
+        return query
+    query = query.replace('%', '%%')
+    return SQL_LITERAL_OR_PLACEHOLDER.sub(lambda m: '%s' if m.group() == '?' else m.group(), query)
+
+class ServerRow(tuple):
+    """sqlite3.Row look-alike: index by position or column name; dict(row) works"""
+    
+    def __new__(cls, values, index: Dict[str, int]):
+        row = super().__new__(cls, values)
+        row._index = index
+        return row
+    
+    def keys(self) -> List[str]:
+        return list(self._index)
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return super().__getitem__(key)
+
+def server_row_factory(cursor):
+    """psycopg row factory producing ServerRow"""
+    index = {column.name: i for i, column in enumerate(cursor.description or ())}
+    return lambda values: ServerRow(values, index)
+
+class ServerCursor:
+    """sqlite3.Cursor-style wrapper that translates statements with postgres_sql"""
+    
+    def __init__(self, cursor):
+        self._cursor = cursor
+    
+    def execute(self, query: str, params=None):
+        self._cursor.execute(postgres_sql(query, params is not None), params)
+        return self
+    
+    def executemany(self, query: str, seq_of_params):
+        self._cursor.executemany(postgres_sql(query), seq_of_params)
+        return self
+    
+    @property
+    def lastrowid(self):
+        """Identity value generated by the last INSERT of this session"""
+        return self._cursor.connection.execute('SELECT lastval()').fetchone()[0]
+    
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+    
+    @property
+    def description(self):
+        return self._cursor.description
+    
+    def fetchone(self):
+        return self._cursor.fetchone()
+    
+    def fetchmany(self, size: int = None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+    
+    def fetchall(self):
+        return self._cursor.fetchall()
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def close(self):
+        self._cursor.close()
+
+class ServerConnection:
+    """sqlite3.Connection-style wrapper over a psycopg connection
+    
+    Covers what Database and import_data use: execute/executemany/cursor
+    with ? placeholders, commit/rollback, in_transaction, the DB-API
+    exception attributes and isolation_level = None for explicit
+    BEGIN/COMMIT (autocommit).
+    """
+    
+    def __init__(self, conn, psycopg):
+        self._conn = conn
+        self._idle_status = psycopg.pq.TransactionStatus.IDLE
+        self.Error = psycopg.Error
+        self.IntegrityError = psycopg.IntegrityError
+        self.OperationalError = psycopg.OperationalError
+    
+    def cursor(self) -> ServerCursor:
+        return ServerCursor(self._conn.cursor())
+    
+    def execute(self, query: str, params=None) -> ServerCursor:
+        return self.cursor().execute(query, params)
+    
+    def executemany(self, query: str, seq_of_params) -> ServerCursor:
+        return self.cursor().executemany(query, seq_of_params)
+    
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.info.transaction_status != self._idle_status
+    
+    @property
+    def isolation_level(self):
+        return None if self._conn.autocommit else 'DEFERRED'
+    
+    @isolation_level.setter
+    def isolation_level(self, value):
+        self._conn.autocommit = value is None
+    
+    @property
+    def closed(self) -> bool:
+        return self._conn.closed
+    
+    def commit(self):
+        self._conn.commit()
+    
+    def rollback(self):
+        self._conn.rollback()
+    
+    def close(self):
+        self._conn.close()
+
+class PostgresBackend(StorageBackend):
+    """A PostgreSQL server (or one speaking its protocol) via psycopg 3
+    
+    For deployments that outgrow one SQLite file: every app instance
+    connects to the same server. Needs `pip install "psycopg[binary]"`.
+    DATE and TIMESTAMP values come back as ISO strings and NUMERIC as
+    float, as they do from SQLite. There is no FTS5, so search_syllabus
+    uses the fuzzy term index directly.
+    """
+    
+    name = 'postgres'
+    
+    def __init__(self, dsn: str, max_idle: int = 8, connect_timeout: int = 10):
+        try:
+            import psycopg
+        except ImportError as e:
+            raise RuntimeError('PostgreSQL storage needs psycopg: pip install "psycopg[binary]"') from e
+        super().__init__(max_idle)
+        self.db_path = dsn
+        self.connect_timeout = connect_timeout
+        self.psycopg = psycopg
+        self.Error = psycopg.Error
+    
+    def connect(self) -> ServerConnection:
+        """Open a new configured connection (not managed by the pool)"""
+        from psycopg.types.numeric import FloatLoader
+        from psycopg.types.string import TextLoader
+        
+        conn = self.psycopg.connect(self.db_path, row_factory=server_row_factory,
+                                    connect_timeout=self.connect_timeout)
+        for type_name in ('date', 'timestamp', 'timestamptz'):
+            conn.adapters.register_loader(type_name, TextLoader)
+        conn.adapters.register_loader('numeric', FloatLoader)
+        conn.prepared_max = STATEMENT_CACHE_SIZE
+        return ServerConnection(conn, self.psycopg)
+    
+    def connect_read_only(self) -> ServerConnection:
+        conn = self.connect()
+        conn.execute('SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY')
+        conn.commit()
+        return conn
+    
+    def is_usable(self, conn) -> bool:
+        return not conn.closed
+    
+    def is_busy_error(self, error: Exception) -> bool:
+        return getattr(error, 'sqlstate', None) in POSTGRES_BUSY_SQLSTATES
+    
+    def get_schema_version(self, conn) -> int:
+        conn.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+        return conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+    
+    def set_schema_version(self, conn, version: int):
+        conn.execute('DELETE FROM schema_version')
+        conn.execute('INSERT INTO schema_version (version) VALUES (?)', (version,))
+    
+    def table_columns(self, conn, table: str) -> List[str]:
+        return [row[0] for row in conn.execute('''
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ?
+            ORDER BY ordinal_position
+        ''', (table,))]
+    
+    def explain(self, conn, query: str, params=()) -> List[str]:
+        return [row[0] for row in conn.execute(f'EXPLAIN {query}', params)]
+
+def default_db_location() -> str:
+    """The app's database: $DATABASE_URL if set, else DEFAULT_DB_PATH
+
+    Resolves the location without opening it, for tools such as
+    bulk_reports that must not create tables or run migrations.
+    """
+    return os.environ.get('DATABASE_URL') or DEFAULT_DB_PATH
+
+def open_backend(location: str) -> StorageBackend:
+    """Backend for a database location: a postgresql:// URL or a SQLite file path"""
+    if location.startswith(('postgresql://', 'postgres://')):
+        return PostgresBackend(location)
+    return SQLiteBackend(location)
+
+class WriteQueue:
+    """Single writer thread that commits queued write jobs in batches
+
+    A job is a callable taking the writer's connection. The thread takes
+    every job waiting (up to WRITE_BATCH_SIZE), runs each in its own
+    SAVEPOINT inside one write transaction and commits once, so
+    a burst of diary submissions costs one commit rather than one lock
+    fight per session. A job that raises is rolled back on its own and the
+    error re-raised to its caller; a busy database retries the batch. If
+    the writer cannot connect, queued jobs fail with that error and the
+    next write starts a new writer thread.
+    """
+    
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._conn = None
+        self._start_lock = threading.Lock()
+    
+    def submit(self, job) -> Future:
+        """Queue job(conn); the Future resolves to its return value"""
+        future = Future()
+        with self._start_lock:
+            self._jobs.put((job, future))
+            if self._thread is None:
+                self._start()
+        return future
+    
+    def run(self, job):
+        """Run job(conn) on the writer thread and wait for its result
+
+        Raises TimeoutError after WRITE_TIMEOUT_S; the job may still be
+        committed later.
+        """
+        if threading.current_thread() is self._thread:
+            return job(self._conn)  # a job writing through another Database method
+        try:
+            return self.submit(job).result(timeout=WRITE_TIMEOUT_S)
+        except FutureTimeoutError:
+            # Only an alias of the builtin TimeoutError from Python 3.11 on
+            raise TimeoutError(f'Database write not finished after {WRITE_TIMEOUT_S}s') from None
+    
+    def _start(self):
+        """Start a writer thread (caller holds _start_lock)"""
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+    
+    def _exit(self, error: Exception = None):
+        """End this writer thread; the next submit() starts a fresh one
+
+        With error (the connection could not be opened) every queued job
+        fails with it instead of waiting for a writer that never comes;
+        without, queued jobs go to a new thread straight away.
+        """
+        with self._start_lock:
+            self._thread = None
+            self._conn = None
+            if error is None:
+                if not self._jobs.empty():
+                    self._start()
+                return
+            while True:
+                try:
+                    _, future = self._jobs.get_nowait()
+                except queue.Empty:
+                    return
+                future.set_exception(error)
+    
+    def _run(self):
+        try:
+            self._conn = self.backend.connect()
+            self._conn.isolation_level = None  # transactions are managed explicitly
+        except Exception as e:
+            print(f"⚠️ Database writer could not connect: {e}")
+            self._exit(e)
+            return
+        
+        while True:
+            batch = [self._jobs.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
             
-            data_dir = os.path.join(base_dir, 'data')
+            try:
+                outcomes = retry_busy(lambda: self._commit(batch), self.backend.is_busy_error)
+            except Exception as e:
+                outcomes = [(False, e)] * len(batch)
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
             
+            if not self.backend.is_usable(self._conn):
+                # Connection lost (e.g. database server restarted): reconnect in a new thread
+                self._conn.close()
+                self._exit()
+                return
+    
+    def _commit(self, batch) -> List[Tuple[bool, object]]:
+        """Apply a batch in one transaction; returns (ok, result or error) per job"""
+        monitor = self.backend.monitor
+        conn = monitor.wrap(self._conn, self.backend) if monitor else self._conn
+        # When monitoring, savepoints count for their job's page and method
+        attribute = monitor.attribute if monitor else lambda job=None: nullcontext()
+        outcomes = []
+        with attribute():
+            conn.execute(self.backend.begin_write)
+        try:
+            for job, _ in batch:
+                with attribute(job):
+                    conn.execute('SAVEPOINT job')
+                    try:
+                        outcomes.append((True, job(conn)))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO SAVEPOINT job')
+                        if self.backend.is_busy_error(e):
+                            raise
+                        outcomes.append((False, e))
+                    conn.execute('RELEASE SAVEPOINT job')
+            with attribute():
+                conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                with attribute():
+                    conn.execute('ROLLBACK')
+            raise
+        finally:
+            if monitor:
+                conn.detach()
+        return outcomes
+
+class Database:
+    def __init__(self, db_path=None):
+        """Initialize database with auto-path creation
+
+        db_path is a SQLite file, ':memory:' or a postgresql:// URL; by
+        default the DATABASE_URL environment variable, else data/ayurveda_syllabus.db.
+        """
+        if db_path is None:
+            db_path = default_db_location()
+        if db_path == DEFAULT_DB_PATH:
             # Create data directory if it doesn't exist
-            os.makedirs(data_dir, exist_ok=True)
-            
-            db_path = os.path.join(data_dir, 'ayurveda_syllabus.db')
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
         # SET db_path BEFORE calling other methods
         self.db_path = db_path
+        self.backend = open_backend(db_path)
+        # All app writes go through one thread (see WriteQueue and write())
+        self.writer = WriteQueue(self.backend)
+        # Shared by every session using this Database: key -> (syllabus_version, rows)
+        self._syllabus_cache = OrderedDict()
+        self._syllabus_cache_lock = threading.Lock()
+        # Method name -> [calls, total seconds, slowest call]; see query_stats()
+        self._timings = {}
+        self._timings_lock = threading.Lock()
+        # Per-statement instrumentation, off unless asked for; see enable_monitoring()
+        self.monitor = None
+        if os.environ.get('QUERY_MONITOR'):
+            self.enable_monitoring(float(os.environ.get('QUERY_SLOW_MS', DEFAULT_SLOW_MS)))
         print(f"✓ Database path: {self.db_path}")
         
-        # Now create tables and populate lookups
+        # Now create tables, bring the schema up to date and populate lookups
         self.create_tables()
+        self.migrate()
         self.populate_lookup_tables()
     
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Get a private database connection (caller closes it)
+
+        For bulk jobs that change connection settings; everything else
+        should use connection().
+        """
+        return self.backend.connect()
+    
+    def connection(self):
+        """Pooled connection as a context manager; commits when the block ends"""
+        return self.backend.connection()
+    
+    def write(self, job):
+        """Run job(conn) on the single writer thread and return its result
+
+        The job's statements are committed together with any other writes
+        queued at the same moment; use this for every app write instead of
+        committing on a pooled connection.
+        """
+        if self.monitor:
+            job = self.monitor.bind(job)  # keep the caller's page and method
+        return self.writer.run(job)
+    
+    def _record_timing(self, name: str, seconds: float):
+        with self._timings_lock:
+            timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+    
+    def query_stats(self) -> List[Dict]:
+        """Calls and time per Database method since start (or the last reset)
+
+        One dict per method with calls, total_ms, mean_ms and max_ms, the
+        most expensive first. Cached methods count their cache hits too.
+        """
+        with self._timings_lock:
+            timings = [(name, *timing) for name, timing in self._timings.items()]
+        stats = [{'method': name, 'calls': calls, 'total_ms': round(total * 1000, 2),
+                  'mean_ms': round(total * 1000 / calls, 3), 'max_ms': round(slowest * 1000, 2)}
+                 for name, calls, total, slowest in timings]
+        return sorted(stats, key=lambda stat: stat['total_ms'], reverse=True)
+    
+    def reset_query_stats(self):
+        with self._timings_lock:
+            self._timings.clear()
+        if self.monitor:
+            self.monitor.reset()
+    
+    def enable_monitoring(self, slow_ms: float = DEFAULT_SLOW_MS, slow_log_path: str = None):
+        """Start per-statement instrumentation (see query_monitor.QueryMonitor)
+
+        Statements taking slow_ms or more are appended, with their query
+        plan, to slow_log_path; for a SQLite file that defaults to
+        slow_queries.log next to it.
+        """
+        if slow_log_path is None and self.backend.name == 'sqlite' and self.db_path != ':memory:':
+            slow_log_path = os.path.join(os.path.dirname(os.path.abspath(self.db_path)), 'slow_queries.log')
+        self.monitor = QueryMonitor(slow_ms, slow_log_path)
+        self.backend.monitor = self.monitor
+        print(f"📈 Query monitoring on (slow queries >= {slow_ms:g} ms → {slow_log_path or 'memory only'})")
+        return self.monitor
+    
+    def disable_monitoring(self):
+        self.monitor = None
+        self.backend.monitor = None
+    
+    @contextmanager
+    def page(self, name: str):
+        """Attribute the block's queries to a page (no-op unless monitoring)"""
+        if self.monitor is None:
+            yield
+            return
+        with self.monitor.page(name):
+            yield
+    
+    def dump_query_stats(self, path: str = None) -> str:
+        """JSON of per-method timings and, when monitoring, per-query p50/p95
+
+        Written to path when given; the JSON text is returned either way.
+        """
+        monitor = self.monitor
+        dump = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'backend': self.backend.name,
+            'methods': self.query_stats(),
+            'monitoring_since': monitor.started_at if monitor else None,
+            'slow_ms': monitor.slow_ms if monitor else None,
+            'queries': monitor.report() if monitor else [],
+            'slow_queries': list(monitor.slow_queries) if monitor else [],
+        }
+        text = json.dumps(dump, indent=2, ensure_ascii=False)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+    
+    def _stream(self, name: str, query: str, params) -> Iterator[tuple]:
+        """Header + rows of a query, timed under name until fully read"""
+        start = time.perf_counter()
+        try:
+            with self.connection() as conn:
+                with self.monitor.method(name) if self.monitor else nullcontext():
+                    cursor = conn.execute(query, params)
+                yield from iter_cursor(cursor)
+        finally:
+            self._record_timing(name, time.perf_counter() - start)
     
     def create_tables(self):
         """Create all database tables"""
@@ -104,10 +1265,17 @@ class Database:
                 saq_allowed INTEGER DEFAULT 1,
                 laq_allowed INTEGER DEFAULT 1,
                 status TEXT DEFAULT 'active',
+                slo_key TEXT,
+                content_hash TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        # Databases created before incremental import lack the hash columns
+        self._add_missing_columns(conn, 'syllabus_master', {
+            'slo_key': 'TEXT',
+            'content_hash': 'TEXT',
+        })
         
         # 3. Teacher Subject Assignments
         cursor.execute('''
@@ -319,10 +1487,89 @@ class Database:
             )
         ''')
         
+        # 16. Import State (one content hash per imported sheet)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS syllabus_import_sheets (
+                sheet_name TEXT PRIMARY KEY,
+                subject_code TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                row_count INTEGER,
+                imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
         conn.commit()
         conn.close()
         print("✓ Database tables created")
     
+    def migrate(self) -> List[int]:
+        """Apply pending MIGRATIONS, each in its own transaction
+
+        Returns the versions applied. A migration whose check query does not
+        use the expected index afterwards is reported but kept.
+        """
+        conn = self.get_connection()
+        conn.isolation_level = None
+        current = self.backend.get_schema_version(conn)
+        applied = []
+        
+        for migration in MIGRATIONS:
+            version = migration['version']
+            if version <= current:
+                continue
+            
+            statements = migration.get(f'{self.backend.name}_statements', migration['statements'])
+            if not statements and not migration.get('populate'):
+                # Nothing to do on this engine (e.g. FTS5 on PostgreSQL); no plan to check
+                self.backend.set_schema_version(conn, version)
+                print(f"✓ Migration {version}: not used on {self.backend.name}")
+                continue
+            
+            query, params = migration['check']
+            try:
+                before = self.backend.explain(conn, query, params)
+            except self.backend.Error as e:
+                before = [f'not runnable ({e})']  # the migration creates its table
+            conn.execute('BEGIN')
+            try:
+                for statement in statements:
+                    conn.execute(statement)
+                if migration.get('populate'):
+                    getattr(self, migration['populate'])(conn)
+                self.backend.set_schema_version(conn, version)
+                conn.execute('COMMIT')
+            except self.backend.Error as e:
+                conn.execute('ROLLBACK')
+                if not migration.get('optional'):
+                    conn.close()
+                    raise
+                # Optional feature unavailable in this SQLite build: record and move on
+                self.backend.set_schema_version(conn, version)
+                print(f"⚠️ Migration {version} skipped: {migration['description']} ({e})")
+                continue
+            try:
+                after = self.backend.explain(conn, query, params)
+            except self.backend.Error as e:
+                after = [f'not runnable ({e})']
+            applied.append(version)
+            
+            print(f"✓ Migration {version}: {migration['description']}")
+            print(f"    before: {' | '.join(before)}")
+            print(f"    after:  {' | '.join(after)}")
+            # expect names SQLite plan output; other engines plan differently
+            if self.backend.name == 'sqlite' and not any(migration['expect'] in line for line in after):
+                print(f"    ⚠️ plan does not use {migration['expect']}")
+        
+        conn.close()
+        return applied
+    
+    def _add_missing_columns(self, conn, table: str, columns: Dict[str, str]):
+        """Add columns introduced after a table was first created"""
+        existing = set(self.backend.table_columns(conn, table))
+        for name, col_type in columns.items():
+            if name not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {col_type}')
+    
     def populate_lookup_tables(self):
         """Populate lookup tables with NCISM abbreviations"""
         conn = self.get_connection()
@@ -358,7 +1605,7 @@ class Database:
             ('AFT-SET', 'Affective / Organization', 'Affective', 17),
             ('AFT-CHR', 'Affective / Characterization', 'Affective', 18),
         ]
-        cursor.executemany('INSERT OR IGNORE INTO domain_master VALUES (?, ?, ?, ?)', domains)
+        cursor.executemany('INSERT INTO domain_master VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING', domains)
         
         # Teaching Methods Master Data
         teaching_methods = [
@@ -383,7 +1630,7 @@ class Database:
             ('ECE', 'Early Clinical Exposure', 'Practical & Clinical', 19),
             ('L&GD', 'Lecture & Group Discussion', 'Lecture-Based', 20),
         ]
-        cursor.executemany('INSERT OR IGNORE INTO teaching_methods_master VALUES (?, ?, ?, ?)', teaching_methods)
+        cursor.executemany('INSERT INTO teaching_methods_master VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING', teaching_methods)
         
         # Assessment Methods Master Data
         assessment_methods = [
@@ -400,7 +1647,7 @@ class Database:
             ('P-PRF', 'Practical Performance', 'Practical', 11),
             ('T-OBT', 'Theory open book test', 'Theory', 12),
         ]
-        cursor.executemany('INSERT OR IGNORE INTO assessment_methods_master VALUES (?, ?, ?, ?)', assessment_methods)
+        cursor.executemany('INSERT INTO assessment_methods_master VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING', assessment_methods)
         
         # Priority Master Data
         priorities = [
@@ -408,7 +1655,7 @@ class Database:
             ('Dk', 'Desirable to know', 2),
             ('Nk', 'Nice to know', 3),
         ]
-        cursor.executemany('INSERT OR IGNORE INTO priority_master VALUES (?, ?, ?)', priorities)
+        cursor.executemany('INSERT INTO priority_master VALUES (?, ?, ?) ON CONFLICT DO NOTHING', priorities)
         
         # Competency Master Data
         competencies = [
@@ -417,7 +1664,7 @@ class Database:
             ('Sh', 'Shows How', 3),
             ('D', 'Does', 4),
         ]
-        cursor.executemany('INSERT OR IGNORE INTO competency_master VALUES (?, ?, ?)', competencies)
+        cursor.executemany('INSERT INTO competency_master VALUES (?, ?, ?) ON CONFLICT DO NOTHING', competencies)
         
         # Integration Master Data
         integrations = [
@@ -428,62 +1675,114 @@ class Database:
             ('H-SW', 'Swasthavritta', 'Horizontal', 5),
             ('V-KS', 'Kriya Sharir', 'Vertical', 6),
         ]
-        cursor.executemany('INSERT OR IGNORE INTO integration_master VALUES (?, ?, ?, ?)', integrations)
+        cursor.executemany('INSERT INTO integration_master VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING', integrations)
         
         conn.commit()
         conn.close()
         print("✓ Lookup tables populated")
     
+    # Syllabus Snapshot Methods
+    
+    @timed
+    def load_snapshot(self, snapshot_path: str, workbook_path: str = None) -> int:
+        """Fill an empty syllabus_master from a prebuilt snapshot
+
+        The gzip snapshot (see import_data.build_snapshot) is unpacked to a
+        temporary file, ATTACHed and SNAPSHOT_TABLES copied across in one
+        transaction, so syllabus_ids match the snapshot exactly and the
+        fuzzy index and topics need no rebuild. Returns the number of SLOs
+        loaded, or 0 when the snapshot is missing, from another format or
+        built from a different workbook - the caller then parses Excel.
+        Snapshots are SQLite files, so other backends always import Excel.
+        """
+        if self.backend.name != 'sqlite' or not os.path.exists(snapshot_path):
+            return 0
+        
+        fd, tmp_path = tempfile.mkstemp(suffix='.db')
+        try:
+            with os.fdopen(fd, 'wb') as dst, gzip.open(snapshot_path, 'rb') as src:
+                shutil.copyfileobj(src, dst)
+            
+            conn = self.get_connection()
+            try:
+                conn.execute('ATTACH DATABASE ? AS snap', (tmp_path,))
+                meta = dict(conn.execute('SELECT key, value FROM snap.snapshot_meta').fetchall())
+                if str(meta.get('format')) != str(SNAPSHOT_FORMAT):
+                    print(f"⚠️ Snapshot format {meta.get('format')} unsupported, ignoring")
+                    return 0
+                if (workbook_path and os.path.exists(workbook_path)
+                        and meta.get('workbook_sha1') != file_sha1(workbook_path)):
+                    print("⚠️ Snapshot is older than the workbook, ignoring")
+                    return 0
+                
+                loaded = 0
+                for table in SNAPSHOT_TABLES:
+                    main_cols = {row['name'] for row in conn.execute(f'PRAGMA main.table_info({table})')}
+                    cols = ', '.join(row['name'] for row in conn.execute(f'PRAGMA snap.table_info({table})')
+                                     if row['name'] in main_cols)
+                    cursor = conn.execute(
+                        f'INSERT OR REPLACE INTO main.{table} ({cols}) SELECT {cols} FROM snap.{table}')
+                    if table == 'syllabus_master':
+                        loaded = cursor.rowcount
+                conn.commit()
+                print(f"✓ Loaded {loaded} SLOs from snapshot built {meta.get('built_at')}")
+            finally:
+                conn.close()
+            self.rebuild_coverage_summary()
+            self.bump_syllabus_version()
+            return loaded
+        except (OSError, sqlite3.DatabaseError) as e:
+            print(f"⚠️ Could not load snapshot: {e}")
+            return 0
+        finally:
+            os.remove(tmp_path)
+    
     # Teacher Management Methods
     
+    @timed
     def create_teacher(self, username: str, password: str, full_name: str, **kwargs) -> int:
         """Create a new teacher"""
         import hashlib
         password_hash = hashlib.sha256(password.encode()).hexdigest()
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO teachers (username, password_hash, full_name, email, phone, designation, department)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (username, password_hash, full_name, kwargs.get('email'), kwargs.get('phone'),
-              kwargs.get('designation'), kwargs.get('department')))
-        
-        teacher_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        def insert(conn):
+            cursor = conn.execute('''
+                INSERT INTO teachers (username, password_hash, full_name, email, phone, designation, department)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (username, password_hash, full_name, kwargs.get('email'), kwargs.get('phone'),
+                  kwargs.get('designation'), kwargs.get('department')))
+            return cursor.lastrowid
         
-        return teacher_id
+        return self.write(insert)
     
+    @timed
     def authenticate_teacher(self, username: str, password: str) -> Optional[Dict]:
         """Authenticate teacher login"""
         import hashlib
         password_hash = hashlib.sha256(password.encode()).hexdigest()
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM teachers 
-            WHERE username = ? AND password_hash = ? AND status = 'active'
-        ''', (username, password_hash))
-        
-        teacher = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT * FROM teachers 
+                WHERE username = ? AND password_hash = ? AND status = 'active'
+            ''', (username, password_hash))
+            
+            teacher = cursor.fetchone()
         
         if teacher:
             return dict(teacher)
         return None
     
+    @timed
     def get_teacher_by_id(self, teacher_id: int) -> Optional[Dict]:
         """Get teacher details by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM teachers WHERE teacher_id = ?', (teacher_id,))
-        teacher = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT * FROM teachers WHERE teacher_id = ?', (teacher_id,))
+            teacher = cursor.fetchone()
         
         if teacher:
             return dict(teacher)
@@ -491,204 +1790,632 @@ class Database:
     
     # Subject Assignment Methods
     
+    @timed
     def assign_subject_to_teacher(self, teacher_id: int, subject_code: str, year: int, academic_year: str, section: str = None):
         """Assign a subject to a teacher"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        self.write(lambda conn: conn.execute('''
             INSERT INTO teacher_subject_assignments (teacher_id, subject_code, year, academic_year, section)
             VALUES (?, ?, ?, ?, ?)
-        ''', (teacher_id, subject_code, year, academic_year, section))
-        
-        conn.commit()
-        conn.close()
+        ''', (teacher_id, subject_code, year, academic_year, section)))
     
+    @timed
     def get_teacher_subjects(self, teacher_id: int, academic_year: str = None) -> List[Dict]:
         """Get all subjects assigned to a teacher"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        if academic_year:
-            cursor.execute('''
-                SELECT DISTINCT tsa.*, sm.subject_name
-                FROM teacher_subject_assignments tsa
-                JOIN syllabus_master sm ON tsa.subject_code = sm.subject_code
-                WHERE tsa.teacher_id = ? AND tsa.academic_year = ? AND tsa.status = 'active'
-            ''', (teacher_id, academic_year))
-        else:
-            cursor.execute('''
-                SELECT DISTINCT tsa.*, sm.subject_name
-                FROM teacher_subject_assignments tsa
-                JOIN syllabus_master sm ON tsa.subject_code = sm.subject_code
-                WHERE tsa.teacher_id = ? AND tsa.status = 'active'
-            ''', (teacher_id,))
-        
-        subjects = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            if academic_year:
+                cursor.execute('''
+                    SELECT DISTINCT tsa.*, sm.subject_name
+                    FROM teacher_subject_assignments tsa
+                    JOIN syllabus_master sm ON tsa.subject_code = sm.subject_code
+                    WHERE tsa.teacher_id = ? AND tsa.academic_year = ? AND tsa.status = 'active'
+                ''', (teacher_id, academic_year))
+            else:
+                cursor.execute('''
+                    SELECT DISTINCT tsa.*, sm.subject_name
+                    FROM teacher_subject_assignments tsa
+                    JOIN syllabus_master sm ON tsa.subject_code = sm.subject_code
+                    WHERE tsa.teacher_id = ? AND tsa.status = 'active'
+                ''', (teacher_id,))
+            
+            subjects = [dict(row) for row in cursor.fetchall()]
         
         return subjects
     
     # Syllabus Methods
     
-    def get_syllabus_by_subject(self, subject_code: str, filters: Dict = None) -> List[Dict]:
-        """Get syllabus objectives for a subject with optional filters"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        query = 'SELECT * FROM syllabus_master WHERE subject_code = ? AND status = "active"'
-        params = [subject_code]
-        
-        if filters:
-            if filters.get('term'):
-                query += ' AND term = ?'
-                params.append(filters['term'])
-            if filters.get('priority'):
-                query += ' AND priority_level = ?'
-                params.append(filters['priority'])
-            if filters.get('paper'):
-                query += ' AND paper_number = ?'
-                params.append(filters['paper'])
-        
-        query += ' ORDER BY paper_number, topic_number, syllabus_id'
-        
-        cursor.execute(query, params)
-        objectives = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+    @timed
+    def syllabus_version(self) -> int:
+        """Current syllabus version; changes whenever an import touches the syllabus"""
+        with self.connection() as conn:
+            row = conn.execute("SELECT value FROM app_meta WHERE key = 'syllabus_version'").fetchone()
+        return row['value'] if row else 0
+    
+    @timed
+    def bump_syllabus_version(self) -> int:
+        """Invalidate cached syllabus reads in every process using this database"""
+        self.write(lambda conn: conn.execute('''
+            INSERT INTO app_meta (key, value) VALUES ('syllabus_version', 1)
+            ON CONFLICT (key) DO UPDATE SET value = app_meta.value + 1
+        '''))
+        with self._syllabus_cache_lock:
+            self._syllabus_cache.clear()
+        return self.syllabus_version()
+    
+    def _cached_syllabus(self, key: Tuple, loader):
+        """Return loader() through the process-wide LRU syllabus cache
+
+        Entries are tagged with the syllabus version they were read at and
+        reloaded once an import bumps it. Cached values are shared between
+        sessions and must not be modified by callers.
+        """
+        version = self.syllabus_version()
+        with self._syllabus_cache_lock:
+            hit = self._syllabus_cache.get(key)
+            if hit is not None and hit[0] == version:
+                self._syllabus_cache.move_to_end(key)
+                return hit[1]
+        
+        value = loader()
+        with self._syllabus_cache_lock:
+            self._syllabus_cache[key] = (version, value)
+            self._syllabus_cache.move_to_end(key)
+            while len(self._syllabus_cache) > SYLLABUS_CACHE_SIZE:
+                self._syllabus_cache.popitem(last=False)
+        return value
+    
+    @timed
+    def get_subjects(self) -> List[Dict]:
+        """All subjects with their active SLO counts (cached)"""
+        def load():
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT subject_code, MIN(subject_name) as subject_name, MIN(year) as year,
+                           COUNT(*) as cnt
+                    FROM syllabus_master
+                    WHERE status = 'active'
+                    GROUP BY subject_code
+                    ORDER BY year, subject_code
+                ''')
+                return [dict(row) for row in cursor.fetchall()]
+        return self._cached_syllabus(('subjects',), load)
+    
+    @timed
+    def count_slos(self, active_only: bool = False) -> int:
+        """Number of SLOs in syllabus_master (0 means nothing imported yet)"""
+        query = 'SELECT COUNT(*) FROM syllabus_master'
+        if active_only:
+            query += " WHERE status = 'active'"
+        with self.connection() as conn:
+            return conn.execute(query).fetchone()[0]
+    
+    @timed
+    def get_topics(self, subject_code: str, term: str = None) -> List[Dict]:
+        """Topics of a subject in workbook order with SLO counts (cached)
+
+        Each topic has topic_id, topic_number (the syllabus_master value),
+        display_name, terms ('I,II'), slo_count and mk/dk/nk_count. With a
+        term, only topics taught in it are returned and counts cover that
+        term alone.
+        """
+        def load():
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                if term:
+                    cursor.execute('''
+                        SELECT t.topic_id, t.topic_number, t.display_name, t.terms,
+                               tt.slo_count, tt.mk_count, tt.dk_count, tt.nk_count
+                        FROM topic_terms tt
+                        JOIN topics t ON t.subject_code = tt.subject_code AND t.topic_id = tt.topic_id
+                        WHERE tt.subject_code = ? AND tt.term = ?
+                        ORDER BY tt.topic_id
+                    ''', (subject_code, term))
+                else:
+                    cursor.execute('''
+                        SELECT topic_id, topic_number, display_name, terms,
+                               slo_count, mk_count, dk_count, nk_count
+                        FROM topics
+                        WHERE subject_code = ?
+                        ORDER BY topic_id
+                    ''', (subject_code,))
+                return [dict(row) for row in cursor.fetchall()]
+        return self._cached_syllabus(('topics', subject_code, term), load)
+    
+    @timed
+    def get_syllabus_by_subject(self, subject_code: str, filters: Dict = None) -> List[SLORecord]:
+        """Get syllabus objectives for a subject with optional filters (cached)"""
+        filters = filters or {}
+        # {'topic': None} selects SLOs without a topic; no 'topic' key means all topics
+        key = ('syllabus', subject_code, filters.get('term'), filters.get('priority'),
+               filters.get('paper'), 'topic' in filters, filters.get('topic'))
+        return self._cached_syllabus(key, lambda: self._load_syllabus(subject_code, filters))
+    
+    def _load_syllabus(self, subject_code: str, filters: Dict) -> List[SLORecord]:
+        """Query syllabus objectives for a subject, bypassing the cache"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            query = "SELECT * FROM syllabus_master WHERE subject_code = ? AND status = 'active'"
+            params = [subject_code]
+            
+            if filters:
+                if filters.get('term'):
+                    query += ' AND term = ?'
+                    params.append(filters['term'])
+                if filters.get('priority'):
+                    query += ' AND priority_level = ?'
+                    params.append(filters['priority'])
+                if filters.get('paper'):
+                    query += ' AND paper_number = ?'
+                    params.append(filters['paper'])
+                if 'topic' in filters:
+                    query += ' AND topic_number IS ?'
+                    params.append(filters['topic'])
+            
+            query += ' ORDER BY paper_number, topic_number, syllabus_id'
+            
+            cursor.execute(query, params)
+            objectives = [SLORecord(row) for row in cursor.fetchall()]
         
         return objectives
     
+    @timed
     def get_syllabus_by_id(self, syllabus_id: int) -> Optional[Dict]:
         """Get a single syllabus objective by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM syllabus_master WHERE syllabus_id = ?', (syllabus_id,))
-        objective = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT * FROM syllabus_master WHERE syllabus_id = ?', (syllabus_id,))
+            objective = cursor.fetchone()
         
         if objective:
             return dict(objective)
         return None
     
-    def search_syllabus(self, subject_code: str, search_term: str) -> List[Dict]:
-        """Search syllabus objectives by text"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM syllabus_master 
-            WHERE subject_code = ? AND status = 'active'
-            AND (learning_objective_text LIKE ? OR topic_name LIKE ?)
-            ORDER BY paper_number, topic_number, syllabus_id
-        ''', (subject_code, f'%{search_term}%', f'%{search_term}%'))
-        
-        objectives = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
+    @staticmethod
+    def _fts_query(search_term: str) -> str:
+        """Turn free text into a safe FTS5 query
+
+        Words must all match; "quoted text" is a phrase and a trailing *
+        makes a prefix search (Agni*). Other FTS5 syntax is treated as text.
+        """
+        terms = []
+        for part in re.findall(r'"[^"]*"?|\S+', search_term):
+            if part.startswith('"'):
+                phrase = part.strip('"').replace('"', ' ').strip()
+                if phrase:
+                    terms.append(f'"{phrase}"')
+            else:
+                word = part.rstrip('*').replace('"', ' ').strip()
+                if word:
+                    terms.append(f'"{word}"' + ('*' if part.endswith('*') else ''))
+        return ' '.join(terms)
+    
+    @timed
+    def search_syllabus(self, subject_code: Optional[str], search_term: str,
+                        limit: int = 100) -> List[Dict]:
+        """Search active syllabus objectives by text, best matches first
+
+        subject_code=None searches every subject. Each result carries a
+        'snippet' with matches in **bold**, its bm25 'rank' and match='exact'.
+        When nothing matches exactly (or FTS5 is unavailable) the fuzzy term
+        index is used instead; see fuzzy_search_syllabus.
+        """
+        match = self._fts_query(search_term)
+        if not match:
+            return []
+        if not self.backend.full_text_search:
+            return self.fuzzy_search_syllabus(subject_code, search_term, limit)
+        
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            subject_filter = 'AND sm.subject_code = ?' if subject_code else ''
+            params = [match] + ([subject_code] if subject_code else []) + [limit]
+            try:
+                cursor.execute(f'''
+                    SELECT sm.*,
+                           snippet(syllabus_fts, 0, '**', '**', '…', 16) as snippet,
+                           bm25(syllabus_fts) as rank
+                    FROM syllabus_fts
+                    JOIN syllabus_master sm ON sm.syllabus_id = syllabus_fts.rowid
+                    WHERE syllabus_fts MATCH ? AND sm.status = 'active' {subject_filter}
+                    ORDER BY rank
+                    LIMIT ?
+                ''', params)
+            except sqlite3.OperationalError:
+                objectives = []  # no FTS5 in this SQLite build
+            else:
+                objectives = [dict(row, match='exact') for row in cursor.fetchall()]
+        
+        if not objectives:
+            # Misspelt or differently transliterated: use the fuzzy term index
+            objectives = self.fuzzy_search_syllabus(subject_code, search_term, limit)
+        return objectives
+    
+    def _fill_term_index(self, conn):
+        """Rebuild the fuzzy term and trigram index from syllabus_master"""
+        postings = set()
+        for row in conn.execute('SELECT syllabus_id, learning_objective_text, topic_number FROM syllabus_master'):
+            text = f"{row['learning_objective_text'] or ''} {row['topic_number'] or ''}"
+            postings.update((term, row['syllabus_id']) for term in text_terms(text))
+        
+        doc_counts = {}
+        for term, _ in postings:
+            doc_counts[term] = doc_counts.get(term, 0) + 1
+        term_trigrams = {term: trigrams(term) for term in doc_counts}
+        
+        conn.execute('DELETE FROM syllabus_terms')
+        conn.execute('DELETE FROM syllabus_term_vocab')
+        conn.execute('DELETE FROM syllabus_term_trigrams')
+        conn.executemany('INSERT INTO syllabus_terms (term, syllabus_id) VALUES (?, ?)', sorted(postings))
+        conn.executemany('INSERT INTO syllabus_term_vocab (term, doc_count, trigram_count) VALUES (?, ?, ?)',
+                         [(term, count, len(term_trigrams[term])) for term, count in doc_counts.items()])
+        conn.executemany('INSERT INTO syllabus_term_trigrams (trigram, term) VALUES (?, ?)',
+                         [(gram, term) for term, grams in term_trigrams.items() for gram in grams])
+    
+    @timed
+    def rebuild_term_index(self):
+        """Recompute the fuzzy search index; call after a syllabus import"""
+        self.write(self._fill_term_index)
+    
+    def _fill_topics(self, conn):
+        """Rebuild topics and topic_terms from active syllabus objectives"""
+        cursor = conn.execute('''
+            SELECT subject_code, topic_number, COALESCE(term, '') as term,
+                   priority_level, COUNT(*) as n, MIN(syllabus_id) as first_id
+            FROM syllabus_master
+            WHERE status = 'active'
+            GROUP BY subject_code, topic_number, term, priority_level
+        ''')
+        groups = {}  # (subject, topic_number) -> {'first_id', 'terms': {term: counts}}
+        for row in cursor.fetchall():
+            group = groups.setdefault((row['subject_code'], row['topic_number']),
+                                      {'first_id': row['first_id'], 'terms': {}})
+            group['first_id'] = min(group['first_id'], row['first_id'])
+            counts = group['terms'].setdefault(row['term'], {'slo': 0, 'Mk': 0, 'Dk': 0, 'Nk': 0})
+            counts['slo'] += row['n']
+            if row['priority_level'] in counts:
+                counts[row['priority_level']] += row['n']
+        
+        # Headings first in workbook order, then the non-heading groups
+        ordered = sorted(groups.items(), key=lambda item: (
+            item[0][0], topic_display_name(item[0][1]) is None, item[1]['first_id']))
+        topic_rows, term_rows = [], []
+        topic_id, seen, previous_subject = 0, {}, None
+        for (subject_code, topic_number), group in ordered:
+            if subject_code != previous_subject:
+                topic_id, seen, previous_subject = 0, {}, subject_code
+            topic_id += 1
+            name = topic_display_name(topic_number) or 'Other SLOs'
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f'{name} ({seen[name]})'  # Topic 12 and Topic-12
+            
+            totals = {'slo': 0, 'Mk': 0, 'Dk': 0, 'Nk': 0}
+            for term, counts in group['terms'].items():
+                term_rows.append((subject_code, term, topic_id, counts['slo'],
+                                  counts['Mk'], counts['Dk'], counts['Nk']))
+                for key in totals:
+                    totals[key] += counts[key]
+            terms = ','.join(sorted(term for term in group['terms'] if term))
+            topic_rows.append((subject_code, topic_id, topic_number, name, terms, totals['slo'],
+                               totals['Mk'], totals['Dk'], totals['Nk']))
+        
+        conn.execute('DELETE FROM topics')
+        conn.execute('DELETE FROM topic_terms')
+        conn.executemany('INSERT INTO topics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', topic_rows)
+        conn.executemany('INSERT INTO topic_terms VALUES (?, ?, ?, ?, ?, ?, ?)', term_rows)
+    
+    @timed
+    def rebuild_topics(self):
+        """Recompute the topics tables; call after a syllabus import"""
+        self.write(self._fill_topics)
+    
+    @timed
+    def fuzzy_search_syllabus(self, subject_code: Optional[str], search_term: str,
+                              limit: int = 100) -> List[Dict]:
+        """Typo- and transliteration-tolerant search of active objectives
+
+        Query words are folded like the index (Vāta, Waata and वात all match
+        Vata) and matched to indexed terms by trigram similarity. Objectives
+        matching the most query words rank first, then by similarity weighted
+        towards rarer terms. Results carry 'snippet', 'rank' (lower is
+        better) and match='fuzzy'.
+        """
+        query_terms = list(dict.fromkeys(text_terms(search_term)))
+        if not query_terms:
+            return []
+        
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            total = cursor.execute('SELECT COUNT(*) FROM syllabus_master').fetchone()[0] or 1
+            
+            # Adjacent words also match as one compound (pancha mahabhuta ~
+            # panchamahabhuta), counting for both words
+            candidates = [((qi,), term) for qi, term in enumerate(query_terms)]
+            candidates += [((qi, qi + 1), query_terms[qi] + query_terms[qi + 1])
+                           for qi in range(len(query_terms) - 1)]
+            
+            matches = []  # (query word index, indexed term, weight)
+            for word_indexes, query_term in candidates:
+                grams = trigrams(query_term)
+                cursor.execute(f'''
+                    SELECT v.term, COUNT(*) as shared, v.trigram_count, v.doc_count
+                    FROM syllabus_term_trigrams t
+                    JOIN syllabus_term_vocab v ON v.term = t.term
+                    WHERE t.trigram IN ({', '.join('?' * len(grams))})
+                    GROUP BY v.term
+                ''', sorted(grams))
+                for row in cursor.fetchall():
+                    similarity = 2 * row['shared'] / (len(grams) + row['trigram_count'])
+                    if similarity >= FUZZY_MIN_SIMILARITY:
+                        weight = similarity ** 2 * math.log(1 + total / row['doc_count'])
+                        matches.extend((qi, row['term'], weight) for qi in word_indexes)
+            if not matches:
+                return []
+            
+            subject_filter = 'AND sm.subject_code = ?' if subject_code else ''
+            cursor.execute(f'''
+                WITH q (qi, term, weight) AS (VALUES {', '.join(['(?, ?, ?)'] * len(matches))}),
+                hits AS (
+                    SELECT st.syllabus_id, q.qi, MAX(q.weight) as weight
+                    FROM q JOIN syllabus_terms st ON st.term = q.term
+                    GROUP BY st.syllabus_id, q.qi
+                )
+                SELECT sm.*, COUNT(*) as matched, SUM(hits.weight) as score
+                FROM hits
+                JOIN syllabus_master sm ON sm.syllabus_id = hits.syllabus_id
+                WHERE sm.status = 'active' {subject_filter}
+                GROUP BY sm.syllabus_id
+                ORDER BY matched DESC, score DESC, sm.syllabus_id
+                LIMIT ?
+            ''', [value for match in matches for value in match]
+                 + ([subject_code] if subject_code else []) + [limit])
+            rows = cursor.fetchall()
+        
+        matched_terms = {term for _, term, _ in matches}
+        objectives = []
+        for row in rows:
+            objective = dict(row)
+            objective['snippet'] = highlight(objective['learning_objective_text'], matched_terms)
+            objective['rank'] = -objective.pop('score')
+            objective['match'] = 'fuzzy'
+            objectives.append(objective)
         return objectives
     
     # Lookup Methods
     
+    @timed
     def get_all_domains(self) -> Dict[str, str]:
         """Get all domain codes and descriptions"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT domain_code, domain_full FROM domain_master ORDER BY display_order')
-        domains = {row['domain_code']: row['domain_full'] for row in cursor.fetchall()}
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT domain_code, domain_full FROM domain_master ORDER BY display_order')
+            domains = {row['domain_code']: row['domain_full'] for row in cursor.fetchall()}
         
         return domains
     
+    @timed
     def get_all_teaching_methods(self) -> Dict[str, str]:
         """Get all teaching method codes and descriptions"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT method_code, method_full FROM teaching_methods_master ORDER BY display_order')
-        methods = {row['method_code']: row['method_full'] for row in cursor.fetchall()}
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT method_code, method_full FROM teaching_methods_master ORDER BY display_order')
+            methods = {row['method_code']: row['method_full'] for row in cursor.fetchall()}
         
         return methods
     
+    @timed
     def get_all_assessment_methods(self) -> Dict[str, str]:
         """Get all assessment method codes and descriptions"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT method_code, method_full FROM assessment_methods_master ORDER BY display_order')
-        methods = {row['method_code']: row['method_full'] for row in cursor.fetchall()}
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT method_code, method_full FROM assessment_methods_master ORDER BY display_order')
+            methods = {row['method_code']: row['method_full'] for row in cursor.fetchall()}
         
         return methods
     
+    @timed
     def get_all_priorities(self) -> Dict[str, str]:
         """Get all priority codes and descriptions"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT priority_code, priority_full FROM priority_master ORDER BY display_order')
-        priorities = {row['priority_code']: row['priority_full'] for row in cursor.fetchall()}
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT priority_code, priority_full FROM priority_master ORDER BY display_order')
+            priorities = {row['priority_code']: row['priority_full'] for row in cursor.fetchall()}
         
         return priorities
     
+    @timed
     def get_all_competencies(self) -> Dict[str, str]:
         """Get all competency codes and descriptions"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT competency_code, competency_full FROM competency_master ORDER BY display_order')
-        competencies = {row['competency_code']: row['competency_full'] for row in cursor.fetchall()}
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT competency_code, competency_full FROM competency_master ORDER BY display_order')
+            competencies = {row['competency_code']: row['competency_full'] for row in cursor.fetchall()}
         
         return competencies
     
+    # Planning and Coverage Methods
+    
+    @timed
+    def plan_slos(self, teacher_id: int, subject_code: str, syllabus_ids: List[int],
+                  plan_type: str, plan_date=None) -> int:
+        """Put SLOs on a teacher's 'today' or 'next_month' plan in one transaction
+
+        Already-planned SLOs are replanned with the new date. Returns the
+        number of SLOs written.
+        """
+        plan_date = str(plan_date) if plan_date else None
+        rows = [(teacher_id, subject_code, syllabus_id, plan_type, plan_date)
+                for syllabus_id in syllabus_ids]
+        self.write(lambda conn: conn.executemany('''
+            INSERT INTO planned_slos
+            (teacher_id, subject_code, syllabus_id, plan_type, plan_date)
+            VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_DATE))
+            ON CONFLICT (teacher_id, syllabus_id, plan_type) DO UPDATE SET
+                subject_code = excluded.subject_code, plan_date = excluded.plan_date,
+                created_at = CURRENT_TIMESTAMP
+        ''', rows))
+        return len(rows)
+    
+    @timed
+    def mark_slos_complete(self, teacher_id: int, subject_code: str, syllabus_ids: List[int],
+                           coverage_date=None) -> int:
+        """Log SLOs as completed in one transaction
+
+        SLOs the teacher already completed keep their original date.
+        Returns the number newly marked complete.
+        """
+        coverage_date = str(coverage_date) if coverage_date else None
+        rows = [(teacher_id, subject_code, syllabus_id, coverage_date)
+                for syllabus_id in syllabus_ids]
+        if not rows:
+            return 0
+        return self.write(lambda conn: conn.executemany('''
+            INSERT INTO syllabus_coverage_log
+            (teacher_id, subject_code, syllabus_id, coverage_date, coverage_status)
+            VALUES (?, ?, ?, COALESCE(?, CURRENT_DATE), 'completed')
+            ON CONFLICT DO NOTHING
+        ''', rows).rowcount)
+    
+    @timed
+    def get_planned_slos(self, teacher_id: int, subject_code: str, plan_type: str) -> List[Dict]:
+        """A teacher's 'today' or 'next_month' plan with each SLO's text, latest first"""
+        with self.connection() as conn:
+            cursor = conn.execute('''
+                SELECT ps.*, sm.learning_objective_text, sm.topic_number
+                FROM planned_slos ps
+                JOIN syllabus_master sm ON ps.syllabus_id = sm.syllabus_id
+                WHERE ps.teacher_id = ? AND ps.subject_code = ? AND ps.plan_type = ?
+                ORDER BY ps.plan_date DESC
+            ''', (teacher_id, subject_code, plan_type))
+            return [dict(row) for row in cursor.fetchall()]
+    
     # Coverage Statistics
     
+    @timed
+    def get_coverage_between(self, teacher_id: int, subject_code: str, start, end) -> List[Dict]:
+        """SLOs a teacher completed in a subject with start <= coverage_date < end
+
+        start and end are dates or 'YYYY-MM-DD' strings; month_range(year,
+        month) gives the bounds of a calendar month. Rows are in date order.
+        """
+        start, end = str(start), str(end)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(COVERAGE_BETWEEN_SQL, (teacher_id, subject_code, start, end))
+            coverage = [dict(row) for row in cursor.fetchall()]
+        
+        return coverage
+    
+    @timed
+    def get_completed_term_counts(self, teacher_id: int, subject_code: str) -> Dict[str, int]:
+        """Completed SLO count per term for a teacher and subject"""
+        with self.connection() as conn:
+            cursor = conn.execute('''
+                SELECT sm.term, COUNT(*) as cnt
+                FROM syllabus_coverage_log scl
+                JOIN syllabus_master sm ON scl.syllabus_id = sm.syllabus_id
+                WHERE scl.teacher_id = ? AND scl.subject_code = ?
+                GROUP BY sm.term
+            ''', (teacher_id, subject_code))
+            return {row['term']: row['cnt'] for row in cursor.fetchall()}
+    
+    def iter_completed(self, teacher_id: int, subject_code: str, term: str = None) -> Iterator[tuple]:
+        """Stream a teacher's completed SLOs (optionally one term) for export
+
+        Yields the column names, then rows newest first, read in chunks.
+        """
+        if term:
+            return self._stream('iter_completed', COMPLETED_SQL.format(term_filter='AND sm.term = ?'),
+                                (teacher_id, subject_code, term))
+        return self._stream('iter_completed', COMPLETED_SQL.format(term_filter=''),
+                            (teacher_id, subject_code))
+    
+    def iter_coverage_between(self, teacher_id: int, subject_code: str, start, end) -> Iterator[tuple]:
+        """Stream get_coverage_between's rows for export: column names, then rows"""
+        return self._stream('iter_coverage_between', COVERAGE_BETWEEN_SQL,
+                            (teacher_id, subject_code, str(start), str(end)))
+    
+    @timed
+    def rebuild_coverage_summary(self):
+        """Recompute coverage_summary from syllabus_coverage_log
+
+        The triggers keep it current on every log write; call this after a
+        syllabus import (priorities, terms or status may have changed) or to
+        repair the table.
+        """
+        def rebuild(conn):
+            conn.execute('DELETE FROM coverage_summary')
+            conn.execute(COVERAGE_SUMMARY_REBUILD_SQL)
+        self.write(rebuild)
+    
+    @timed
     def get_coverage_stats(self, teacher_id: int, subject_code: str) -> Dict:
-        """Get coverage statistics for a subject"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Total objectives
-        cursor.execute('''
-            SELECT COUNT(*) as total FROM syllabus_master 
-            WHERE subject_code = ? AND status = 'active'
-        ''', (subject_code,))
-        total = cursor.fetchone()['total']
-        
-        # Covered objectives
-        cursor.execute('''
-            SELECT COUNT(DISTINCT syllabus_id) as covered 
-            FROM syllabus_coverage_log
-            WHERE teacher_id = ? AND subject_code = ?
-        ''', (teacher_id, subject_code))
-        covered = cursor.fetchone()['covered']
-        
-        # By priority
-        cursor.execute('''
-            SELECT 
-                sm.priority_level,
-                COUNT(*) as total,
-                COUNT(DISTINCT scl.syllabus_id) as covered
-            FROM syllabus_master sm
-            LEFT JOIN syllabus_coverage_log scl 
-                ON sm.syllabus_id = scl.syllabus_id 
-                AND scl.teacher_id = ?
-            WHERE sm.subject_code = ? AND sm.status = 'active'
-            GROUP BY sm.priority_level
-        ''', (teacher_id, subject_code))
-        
-        by_priority = {row['priority_level']: {'total': row['total'], 'covered': row['covered']} 
-                      for row in cursor.fetchall()}
-        
-        conn.close()
-        
-        return {
-            'total': total,
-            'covered': covered,
-            'percentage': round((covered / total * 100) if total > 0 else 0, 1),
-            'by_priority': by_priority
-        }
+        """Get coverage statistics for a subject
+
+        SLO totals come from the subject's active syllabus and covered counts
+        from coverage_summary, in one grouped query whose cost does not grow
+        with the coverage log. An SLO counts as covered once however many
+        times it was logged. Returns overall total/covered/percentage plus
+        the same figures by priority, term, domain and competency.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT 
+                    t.priority_level, t.term, t.domain_code, t.competency_level,
+                    t.total,
+                    COALESCE(cs.covered, 0) as covered
+                FROM (
+                    SELECT COALESCE(priority_level, '') as priority_level,
+                           COALESCE(term, '') as term,
+                           COALESCE(domain_code, '') as domain_code,
+                           COALESCE(competency_level, '') as competency_level,
+                           COUNT(*) as total
+                    FROM syllabus_master
+                    WHERE subject_code = ? AND status = 'active'
+                    GROUP BY 1, 2, 3, 4
+                ) t
+                LEFT JOIN coverage_summary cs
+                    ON cs.teacher_id = ? AND cs.subject_code = ?
+                    AND cs.priority_level = t.priority_level AND cs.term = t.term
+                    AND cs.domain_code = t.domain_code
+                    AND cs.competency_level = t.competency_level
+                ORDER BY 1, 2, 3, 4
+            ''', (subject_code, teacher_id, subject_code))
+            cells = cursor.fetchall()
+        
+        def tally(groups, key, row):
+            group = groups.setdefault(key, {'total': 0, 'covered': 0})
+            group['total'] += row['total']
+            group['covered'] += row['covered']
+        
+        def with_percentage(group):
+            group['percentage'] = round((group['covered'] / group['total'] * 100)
+                                        if group['total'] > 0 else 0, 1)
+            return group
+        
+        overall = {'total': sum(row['total'] for row in cells),
+                   'covered': sum(row['covered'] for row in cells)}
+        breakdowns = {'by_priority': {}, 'by_term': {}, 'by_domain': {}, 'by_competency': {}}
+        for row in cells:
+            tally(breakdowns['by_priority'], row['priority_level'], row)
+            tally(breakdowns['by_term'], row['term'], row)
+            tally(breakdowns['by_domain'], row['domain_code'], row)
+            tally(breakdowns['by_competency'], row['competency_level'], row)
+        
+        stats = with_percentage(overall)
+        for name, groups in breakdowns.items():
+            ordered = sorted(groups.items(), key=lambda item: (item[0] is None, item[0] or ''))
+            stats[name] = {key: with_percentage(group) for key, group in ordered}
+        return stats
@@ -0,0 +1,60 @@
+"""
+Streaming CSV / Excel exports for the report pages and bulk_reports.py
+Rows come from Database.iter_* methods (or database.iter_cursor) in chunks
+and are written straight to a file, so memory stays flat however many SLOs
+an export covers
+"""
+
+import csv
+import io
+import tempfile
+from typing import BinaryIO, Iterable
+
+from openpyxl import Workbook
+
+CSV_MIME = "text/csv"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def write_csv(rows: Iterable[tuple], out: BinaryIO) -> int:
+    """Write header + rows as UTF-8 CSV to a binary file; returns the data row count"""
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    writer = csv.writer(text, lineterminator='\n')
+    count = -1
+    for count, row in enumerate(rows):
+        writer.writerow(row)
+    text.flush()
+    text.detach()
+    return max(count, 0)
+
+def write_xlsx(rows: Iterable[tuple], out: BinaryIO, sheet_name: str = 'Export') -> int:
+    """Write header + rows with openpyxl's write-only mode; returns the data row count"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    count = -1
+    for count, row in enumerate(rows):
+        sheet.append(row)
+    workbook.save(out)
+    return max(count, 0)
+
+def rewound_reader(out: BinaryIO) -> io.BufferedReader:
+    """Reopen a written temporary file as a rewound BufferedReader
+
+    st.download_button only accepts str, bytes, BytesIO, BufferedReader or
+    raw files from a data callable - not the BufferedRandom TemporaryFile gives.
+    """
+    out.flush()
+    result = io.BufferedReader(out.detach())
+    result.seek(0)
+    return result
+
+def csv_file(rows: Iterable[tuple]) -> io.BufferedReader:
+    """Export header + rows as CSV to a temporary file, rewound for reading"""
+    out = tempfile.TemporaryFile()
+    write_csv(rows, out)
+    return rewound_reader(out)
+
+def xlsx_file(rows: Iterable[tuple], sheet_name: str = 'Export') -> io.BufferedReader:
+    """Export header + rows as .xlsx to a temporary file, rewound for reading"""
+    out = tempfile.TemporaryFile()
+    write_xlsx(rows, out, sheet_name)
+    return rewound_reader(out)
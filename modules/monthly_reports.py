@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
-from io import BytesIO
+from database import month_range
+from exports import CSV_MIME, XLSX_MIME, csv_file, xlsx_file
 
 def show(db, teacher_id, academic_year):
     st.markdown("# 📅 Monthly Reports")
@@ -29,20 +29,8 @@ def show(db, teacher_id, academic_year):
                  "July", "August", "September", "October", "November", "December"].index(month) + 1
     
     # Get completed SLOs for the month
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT sm.*, scl.coverage_date
-        FROM syllabus_coverage_log scl
-        JOIN syllabus_master sm ON scl.syllabus_id = sm.syllabus_id
-        WHERE scl.teacher_id = ? AND scl.subject_code = ?
-        AND strftime('%Y', scl.coverage_date) = ?
-        AND strftime('%m', scl.coverage_date) = ?
-        ORDER BY scl.coverage_date
-    ''', (teacher_id, selected_code, str(year), f"{month_num:02d}"))
-    
-    completed = [dict(r) for r in cursor.fetchall()]
-    conn.close()
+    start, end = month_range(int(year), month_num)
+    completed = db.get_coverage_between(teacher_id, selected_code, start, end)
     
     if not completed:
         st.warning(f"📝 No SLOs completed in {month} {year}")
@@ -64,34 +52,27 @@ def show(db, teacher_id, academic_year):
     
     st.markdown("---")
     
-    # Export buttons
-    df = pd.DataFrame(completed)
-    
+    # Export buttons - files are generated when clicked
     col1, col2 = st.columns(2)
     
     with col1:
         # Excel export
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Completed SLOs')
-        buffer.seek(0)
-        
         st.download_button(
             "📥 Download Excel",
-            buffer,
+            lambda: xlsx_file(db.iter_coverage_between(teacher_id, selected_code, start, end),
+                              sheet_name='Completed SLOs'),
             f"monthly_report_{month}_{year}_{selected_code}.xlsx",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            XLSX_MIME,
             use_container_width=True
         )
     
     with col2:
         # CSV export
-        csv = df.to_csv(index=False)
         st.download_button(
             "📥 Download CSV",
-            csv,
+            lambda: csv_file(db.iter_coverage_between(teacher_id, selected_code, start, end)),
             f"monthly_report_{month}_{year}_{selected_code}.csv",
-            "text/csv",
+            CSV_MIME,
             use_container_width=True
         )
     
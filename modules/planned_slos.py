@@ -9,30 +9,8 @@ def show(db, teacher_id, academic_year):
         st.warning("No subject selected")
         return
     
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    
-    # Get today's plans
-    cursor.execute('''
-        SELECT ps.*, sm.learning_objective_text, sm.topic_number
-        FROM planned_slos ps
-        JOIN syllabus_master sm ON ps.syllabus_id = sm.syllabus_id
-        WHERE ps.teacher_id = ? AND ps.subject_code = ? AND ps.plan_type = 'today'
-        ORDER BY ps.plan_date DESC
-    ''', (teacher_id, selected_code))
-    today_plans = [dict(r) for r in cursor.fetchall()]
-    
-    # Get next month plans
-    cursor.execute('''
-        SELECT ps.*, sm.learning_objective_text, sm.topic_number
-        FROM planned_slos ps
-        JOIN syllabus_master sm ON ps.syllabus_id = sm.syllabus_id
-        WHERE ps.teacher_id = ? AND ps.subject_code = ? AND ps.plan_type = 'next_month'
-        ORDER BY ps.plan_date DESC
-    ''', (teacher_id, selected_code))
-    next_plans = [dict(r) for r in cursor.fetchall()]
-    
-    conn.close()
+    today_plans = db.get_planned_slos(teacher_id, selected_code, 'today')
+    next_plans = db.get_planned_slos(teacher_id, selected_code, 'next_month')
     
     col1, col2 = st.columns(2)
     
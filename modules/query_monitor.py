@@ -0,0 +1,373 @@
+"""
+Opt-in query instrumentation for Database
+Times every statement run on a pooled connection, keeps a latency histogram,
+row counts and the calling page per query, and logs slow queries with their
+query plan. Enable with Database.enable_monitoring() or QUERY_MONITOR=1.
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Upper bounds (ms) of the latency histogram buckets; one more for slower
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Queries at least this slow go to the slow-query log
+DEFAULT_SLOW_MS = 100
+
+# SQLite progress handler granularity: VM instructions per callback
+PROGRESS_OPCODES = 1000
+
+# Recent slow queries kept in memory for the admin page
+SLOW_QUERIES_KEPT = 100
+
+# Statements worth an EXPLAIN when slow (not BEGIN, PRAGMA, DDL ...)
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+# Method recorded for the writer's batch BEGIN/COMMIT, which no single job
+# owns; they count towards no page
+WRITE_BATCH = 'WriteQueue batch'
+
+# Stack frames of these modules are never "the calling page"
+INTERNAL_MODULES = {'database', 'query_monitor', 'exports', 'contextlib', 'threading', 'functools'}
+
+WHITESPACE_RE = re.compile(r'\s+')
+# "(?, ?, ?), (?, ?, ?)" and "IN (?, ?, ?)" lists of any length count as one query
+PLACEHOLDER_LIST_RE = re.compile(r'\(\?(?:, \?)*\)(?:, \(\?(?:, \?)*\))+|\(\?(?:, \?)+\)')
+
+def normalize_sql(query: str) -> str:
+    """One line per query shape: whitespace collapsed, placeholder lists folded"""
+    query = WHITESPACE_RE.sub(' ', query).strip()
+    return PLACEHOLDER_LIST_RE.sub(lambda m: '(?, …), …' if '), (' in m.group() else '(?, …)', query)
+
+def caller_page() -> Optional[str]:
+    """Module name of the nearest caller outside the database layer"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+        if module not in INTERNAL_MODULES:
+            return module
+        frame = frame.f_back
+    return None
+
+class QueryStats:
+    """Running totals and latency histogram of one query shape"""
+    
+    __slots__ = ('method', 'sql', 'calls', 'rows', 'total_ms', 'min_ms', 'max_ms', 'steps',
+                 'statements', 'buckets', 'pages')
+    
+    def __init__(self, method: Optional[str], sql: str):
+        self.method = method
+        self.sql = sql
+        self.calls = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+        self.steps = 0
+        self.statements = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.pages = Counter()
+    
+    def add(self, ms: float, rows: int, steps: int, statements: int, page: Optional[str]):
+        self.calls += 1
+        self.rows += rows
+        self.total_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+        self.steps += steps
+        self.statements += statements
+        self.buckets[bucket_index(ms)] += 1
+        if page:
+            self.pages[page] += 1
+    
+    def percentile(self, fraction: float) -> float:
+        """Latency (ms) at a fraction of calls, interpolated within its bucket"""
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if count and seen + count >= target:
+                # Bucket edges narrowed to the latencies actually seen
+                lower = max(LATENCY_BUCKETS_MS[index - 1] if index else 0.0, self.min_ms)
+                upper = min(LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else math.inf,
+                            self.max_ms)
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+        return self.max_ms
+    
+    def as_dict(self) -> Dict:
+        return {
+            'method': self.method, 'pages': dict(self.pages.most_common()), 'calls': self.calls,
+            'rows_per_call': round(self.rows / self.calls, 1),
+            'p50_ms': round(self.percentile(0.5), 3), 'p95_ms': round(self.percentile(0.95), 3),
+            'min_ms': round(self.min_ms, 3), 'max_ms': round(self.max_ms, 3), 'total_ms': round(self.total_ms, 2),
+            'vm_steps_per_call': self.steps // self.calls,
+            'statements_per_call': round(self.statements / self.calls, 1),
+            'histogram': dict(zip([f'<={edge}ms' for edge in LATENCY_BUCKETS_MS] + ['slower'],
+                                  self.buckets)),
+            'sql': self.sql,
+        }
+
+def bucket_index(ms: float) -> int:
+    for index, edge in enumerate(LATENCY_BUCKETS_MS):
+        if ms <= edge:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+class QueryMonitor:
+    """Collects per-query statistics from MonitoredConnection wrappers
+    
+    Queries are keyed by the Database method that ran them (see
+    database.timed) and their normalized SQL. The calling page is the one
+    set with page(), else the nearest page module on the stack.
+    """
+    
+    def __init__(self, slow_ms: float = DEFAULT_SLOW_MS, slow_log_path: str = None):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.slow_queries = deque(maxlen=SLOW_QUERIES_KEPT)
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    # Context: which page and Database method a statement belongs to
+    
+    @contextmanager
+    def page(self, name: str):
+        """Attribute statements run inside the block to page name"""
+        previous = getattr(self._local, 'page', None)
+        self._local.page = name
+        try:
+            yield
+        finally:
+            self._local.page = previous
+    
+    @contextmanager
+    def method(self, name: str):
+        """Attribute statements to a Database method (the outermost one wins)"""
+        if getattr(self._local, 'method', None) is not None:
+            yield
+            return
+        self._local.method = name
+        try:
+            yield
+        finally:
+            self._local.method = None
+    
+    @contextmanager
+    def use(self, context):
+        """Attribute statements to context, a (page, method) pair from context()"""
+        previous = (getattr(self._local, 'page', None), getattr(self._local, 'method', None))
+        self._local.page, self._local.method = context
+        try:
+            yield
+        finally:
+            self._local.page, self._local.method = previous
+    
+    def context(self):
+        """(page, method) of the current thread"""
+        return (getattr(self._local, 'page', None) or caller_page(),
+                getattr(self._local, 'method', None))
+    
+    def bind(self, job):
+        """Wrap job to run under the current thread's context (writer thread jobs)"""
+        context = self.context()
+        def bound(conn):
+            with self.use(context):
+                return job(conn)
+        bound.context = context
+        return bound
+    
+    def attribute(self, job=None):
+        """Context for a writer statement: the bound job's, else WRITE_BATCH"""
+        return self.use(getattr(job, 'context', None) or (None, WRITE_BATCH))
+    
+    # Recording
+    
+    def wrap(self, conn, backend) -> 'MonitoredConnection':
+        return MonitoredConnection(conn, self, backend)
+    
+    def record(self, query: str, params, context, ms: float, rows: int, steps: int,
+               statements: int, conn, backend):
+        page, method = context
+        if method == WRITE_BATCH:
+            page = None
+        sql = normalize_sql(query)
+        with self._lock:
+            stats = self._stats.get((method, sql))
+            if stats is None:
+                stats = self._stats[(method, sql)] = QueryStats(method, sql)
+            stats.add(ms, rows, steps, statements, page)
+        if ms >= self.slow_ms:
+            self._log_slow(query, params, sql, ms, rows, page, method, conn, backend)
+    
+    def _log_slow(self, query, params, sql, ms, rows, page, method, conn, backend):
+        plan = []
+        if sql.upper().startswith(EXPLAINABLE):
+            try:
+                plan = backend.explain(conn, query, params if params is not None else ())
+            except Exception as e:
+                plan = [f'EXPLAIN failed: {e}']
+        # Parameters are left out: they include password hashes and teacher data
+        entry = {'at': datetime.now().isoformat(timespec='seconds'), 'ms': round(ms, 2),
+                 'rows': rows, 'page': page, 'method': method, 'sql': sql, 'plan': plan}
+        self.slow_queries.append(entry)
+        if self.slow_log_path:
+            with self._lock, open(self.slow_log_path, 'a', encoding='utf-8') as log:
+                log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    
+    # Reporting
+    
+    def report(self) -> List[Dict]:
+        """Per-query statistics (see QueryStats.as_dict), most total time first"""
+        with self._lock:
+            rows = [stats.as_dict() for stats in self._stats.values()]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+    
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow_queries.clear()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+
+class MonitoredCursor:
+    """Cursor wrapper timing execute and fetch calls of one statement at a time"""
+    
+    def __init__(self, cursor, conn: 'MonitoredConnection'):
+        self._cursor = cursor
+        self._conn = conn
+        # [query, params, (page, method), seconds, rows, steps, statements] until read
+        self._pending = None
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+    
+    def _run(self, call, query, params):
+        self.finish()
+        conn = self._conn
+        steps, statements = conn.steps, conn.statements
+        context = conn.monitor.context()
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        self._pending = [query, params, context, elapsed, 0,
+                         conn.steps - steps, conn.statements - statements]
+        if self._cursor.description is None:
+            self._pending[4] = max(self._cursor.rowcount, 0)
+            self.finish()
+        else:
+            conn.open_cursors.add(self)
+        return self
+    
+    def execute(self, query: str, params=None):
+        if params is None:
+            return self._run(lambda: self._cursor.execute(query), query, params)
+        return self._run(lambda: self._cursor.execute(query, params), query, params)
+    
+    def executemany(self, query: str, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        return self._run(lambda: self._cursor.executemany(query, seq_of_params), query,
+                         seq_of_params[0] if seq_of_params else None)
+    
+    def _fetch(self, call, count, done):
+        pending = self._pending
+        if pending is None:
+            return call()
+        steps, statements = self._conn.steps, self._conn.statements
+        start = time.perf_counter()
+        result = call()
+        pending[3] += time.perf_counter() - start
+        pending[4] += count(result)
+        pending[5] += self._conn.steps - steps
+        pending[6] += self._conn.statements - statements
+        if done(result):
+            self.finish()
+        return result
+    
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone, lambda row: row is not None,
+                           lambda row: row is None)
+    
+    def fetchmany(self, size: int = None):
+        size = size or self._cursor.arraysize
+        return self._fetch(lambda: self._cursor.fetchmany(size), len, lambda rows: len(rows) < size)
+    
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall, len, lambda rows: True)
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+    
+    def finish(self):
+        """Record the current statement (called once it is fully read)"""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        self._conn.open_cursors.discard(self)
+        query, params, context, seconds, rows, steps, statements = pending
+        self._conn.monitor.record(query, params, context, seconds * 1000, rows, steps,
+                                  statements, self._conn.raw, self._conn.backend)
+    
+    def close(self):
+        self.finish()
+        self._cursor.close()
+
+class MonitoredConnection:
+    """Connection wrapper handing out MonitoredCursors
+    
+    On SQLite a progress handler counts VM instructions and a trace
+    callback counts statements run (trigger bodies included); detach()
+    removes both and records statements whose rows were never all read.
+    """
+    
+    def __init__(self, conn, monitor: QueryMonitor, backend):
+        self.raw = conn
+        self.monitor = monitor
+        self.backend = backend
+        self.open_cursors = set()
+        self.steps = 0
+        self.statements = 0
+        if hasattr(conn, 'set_progress_handler'):
+            conn.set_progress_handler(self._progress, PROGRESS_OPCODES)
+            conn.set_trace_callback(self._trace)
+    
+    def _progress(self):
+        self.steps += PROGRESS_OPCODES
+        return 0  # keep running
+    
+    def _trace(self, statement):
+        self.statements += 1
+    
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+    
+    def cursor(self) -> MonitoredCursor:
+        return MonitoredCursor(self.raw.cursor(), self)
+    
+    def execute(self, query: str, params=None) -> MonitoredCursor:
+        return self.cursor().execute(query, params)
+    
+    def executemany(self, query: str, seq_of_params) -> MonitoredCursor:
+        return self.cursor().executemany(query, seq_of_params)
+    
+    def detach(self):
+        for cursor in list(self.open_cursors):
+            cursor.finish()
+        if hasattr(self.raw, 'set_progress_handler'):
+            self.raw.set_progress_handler(None, 0)
+            self.raw.set_trace_callback(None)
@@ -0,0 +1,88 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+def show(db, teacher_id, academic_year):
+    st.markdown("# 🛠️ Query Performance")
+    
+    monitor = db.monitor
+    if monitor is None:
+        st.info("Query monitoring is off. Start it here or set QUERY_MONITOR=1 before launching the app.")
+        if st.button("▶️ Start Monitoring"):
+            db.enable_monitoring()
+            st.rerun()
+        return
+    
+    st.caption(f"Recording since {monitor.started_at} · slow-query log: {monitor.slow_log_path or 'memory only'}")
+    
+    queries = monitor.report()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Statements", sum(q['calls'] for q in queries))
+    with col2:
+        st.metric("Distinct Queries", len(queries))
+    with col3:
+        st.metric("Slow Queries", len(monitor.slow_queries))
+    with col4:
+        monitor.slow_ms = st.number_input("Slow threshold (ms)", 0.1, 10000.0, float(monitor.slow_ms))
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            "📥 Download JSON",
+            lambda: db.dump_query_stats(),
+            f"query_stats_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
+            "application/json",
+            use_container_width=True
+        )
+    with col2:
+        if st.button("🔄 Reset", use_container_width=True):
+            db.reset_query_stats()
+            st.rerun()
+    with col3:
+        if st.button("⏹️ Stop Monitoring", use_container_width=True):
+            db.disable_monitoring()
+            st.rerun()
+    
+    st.markdown("---")
+    
+    # Per query, most total time first
+    st.markdown("### Queries")
+    if not queries:
+        st.info("No queries recorded yet - use the app and come back")
+        return
+    
+    df = pd.DataFrame([{
+        'Method': q['method'] or '-',
+        'Pages': ', '.join(q['pages']),
+        'Calls': q['calls'],
+        'p50 ms': q['p50_ms'],
+        'p95 ms': q['p95_ms'],
+        'Max ms': q['max_ms'],
+        'Total ms': q['total_ms'],
+        'Rows/call': q['rows_per_call'],
+        'VM steps/call': q['vm_steps_per_call'],
+        'SQL': q['sql'],
+    } for q in queries])
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    
+    # Latency histogram of one query
+    choice = st.selectbox("Latency histogram", range(len(queries)),
+                          format_func=lambda i: f"{queries[i]['method'] or '-'}: {queries[i]['sql'][:80]}")
+    st.bar_chart(pd.Series(queries[choice]['histogram'], name='calls'), sort=False)
+    
+    st.markdown("---")
+    
+    st.markdown("### Database Methods")
+    st.dataframe(pd.DataFrame(db.query_stats()), use_container_width=True, hide_index=True)
+    
+    st.markdown("---")
+    
+    st.markdown(f"### 🐢 Slow Queries (≥ {monitor.slow_ms:g} ms)")
+    if not monitor.slow_queries:
+        st.success("✅ No slow queries")
+    for entry in reversed(monitor.slow_queries):
+        with st.expander(f"{entry['ms']} ms · {entry['method'] or '-'} · {entry['page']} · {entry['at']}"):
+            st.code(entry['sql'], language='sql')
+            st.code('\n'.join(entry['plan']) or 'No plan', language='text')
@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
+from exports import CSV_MIME, csv_file
 
 def show(db, teacher_id, academic_year):
     st.markdown("# 📥 Export Reports")
@@ -16,35 +16,22 @@ def show(db, teacher_id, academic_year):
     st.info(f"**Subject:** {selected_name}")
     st.markdown("---")
     
-    # Get completed SLOs
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT sm.*, scl.coverage_date
-        FROM syllabus_coverage_log scl
-        JOIN syllabus_master sm ON scl.syllabus_id = sm.syllabus_id
-        WHERE scl.teacher_id = ? AND scl.subject_code = ?
-        ORDER BY scl.coverage_date DESC
-    ''', (teacher_id, selected_code))
-    
-    completed = [dict(r) for r in cursor.fetchall()]
-    conn.close()
+    # Count completed SLOs; the rows themselves are only read on download
+    term_counts = db.get_completed_term_counts(teacher_id, selected_code)
     
+    completed = sum(term_counts.values())
     if not completed:
         st.warning("📝 No completed SLOs yet. Start logging in Teaching Diary!")
         return
     
-    st.success(f"✅ {len(completed)} SLOs completed")
-    
-    # Export button
-    df = pd.DataFrame(completed)
-    csv = df.to_csv(index=False)
+    st.success(f"✅ {completed} SLOs completed")
     
+    # Export button - the CSV is generated when clicked
     st.download_button(
         "📥 Download All Completed SLOs (CSV)",
-        csv,
+        lambda: csv_file(db.iter_completed(teacher_id, selected_code)),
         f"completed_{selected_code}_{datetime.now().strftime('%Y%m%d')}.csv",
-        "text/csv",
+        CSV_MIME,
         use_container_width=True
     )
     
@@ -55,16 +42,14 @@ def show(db, teacher_id, academic_year):
     col1, col2, col3 = st.columns(3)
     
     for idx, term in enumerate(['I', 'II', 'III']):
-        term_slos = [s for s in completed if s.get('term') == term]
+        count = term_counts.get(term, 0)
         with [col1, col2, col3][idx]:
-            if term_slos:
-                df_term = pd.DataFrame(term_slos)
-                csv_term = df_term.to_csv(index=False)
+            if count:
                 st.download_button(
-                    f"Term {term} ({len(term_slos)})",
-                    csv_term,
+                    f"Term {term} ({count})",
+                    lambda term=term: csv_file(db.iter_completed(teacher_id, selected_code, term)),
                     f"term_{term}_{selected_code}.csv",
-                    "text/csv",
+                    CSV_MIME,
                     use_container_width=True
                 )
             else:
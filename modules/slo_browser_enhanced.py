@@ -1,5 +1,14 @@
 import streamlit as st
-import json
+
+# Page sizes offered in Browse SLOs
+PAGE_SIZES = [10, 25, 50]
+
+# Bulk action label -> planned_slos plan_type (None marks complete)
+BULK_ACTIONS = {
+    "📅 Plan for today's class": 'today',
+    "📆 Plan for next month": 'next_month',
+    "✅ Mark complete": None,
+}
 
 def get_abbr_full(code, type='priority'):
     """Get full form of abbreviation"""
@@ -24,6 +33,20 @@ def show(db, teacher_id, academic_year):
     
     st.info(f"**Subject:** {st.session_state.get('selected_subject_name')}")
     
+    # SEARCH
+    search = st.text_input("🔍 Search SLOs", placeholder='e.g. Prakriti, "Vata dosha", Agni*')
+    if search:
+        all_subjects = st.checkbox("Search all subjects")
+        results = db.search_syllabus(None if all_subjects else selected_code, search)
+        st.markdown(f"### {len(results)} matches for \"{search}\"")
+        if results and results[0]['match'] == 'fuzzy':
+            st.caption("No exact matches - showing close spellings (Vāta, Waata, वात ...)")
+        for slo in results:
+            st.markdown(f"**{slo['subject_code']} · {slo['topic_number']}** · Term {slo['term']} · {slo['priority_level']}")
+            st.markdown(slo['snippet'])
+            st.markdown("---")
+        return
+    
     # TERM FILTER - NEW!
     col1, col2 = st.columns([1, 3])
     with col1:
@@ -31,136 +54,168 @@ def show(db, teacher_id, academic_year):
     
     term_val = None if term_filter == "All Terms" else term_filter.split()[1]
     
-    # Get SLOs
-    filters = {}
-    if term_val:
-        filters['term'] = term_val
+    # Topics come precomputed from the importer (see Database.get_topics)
+    topics = db.get_topics(selected_code, term_val)
     
-    slos = db.get_syllabus_by_subject(selected_code, filters)
-    
-    if not slos:
+    if not topics:
         st.error("No SLOs found!")
         return
     
-    st.success(f"📚 {len(slos)} SLOs available" + (f" (Term {term_val})" if term_val else ""))
-    
-    # Group by topic - REMOVE invalid entries
-    topics = {}
-    for slo in slos:
-        t = slo.get('topic_number', 'General')
-        # Skip if topic contains unwanted text
-        if 'Q3 LAQ' in t or 'Must know' in t:
-            continue
-        if t not in topics:
-            topics[t] = []
-        topics[t].append(slo)
-    
-    if not topics:
-        st.error("No topics found!")
-        return
+    total = sum(t['slo_count'] for t in topics)
+    st.success(f"📚 {total} SLOs available" + (f" (Term {term_val})" if term_val else ""))
     
     st.markdown("---")
     
     # Topic selection
-    topic_list = list(topics.keys())
-    topic = st.selectbox("📑 Select Topic", topic_list)
+    topic = st.selectbox("📑 Select Topic", topics, format_func=lambda t: t['display_name'])
     
-    st.markdown(f"### {len(topics[topic])} SLOs in {topic}")
+    st.markdown(f"### {topic['slo_count']} SLOs in {topic['display_name']}")
     
     # STATISTICS - NEW!
-    mk = len([s for s in topics[topic] if s.get('priority_level') == 'Mk'])
-    dk = len([s for s in topics[topic] if s.get('priority_level') == 'Dk'])
-    nk = len([s for s in topics[topic] if s.get('priority_level') == 'Nk'])
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🔴 Must Know", topic['mk_count'])
+    with col2:
+        st.metric("🟡 Desirable", topic['dk_count'])
+    with col3:
+        st.metric("🟢 Nice to Know", topic['nk_count'])
+    
+    st.markdown("---")
+    
+    # Display SLOs - one page at a time, details only for expanded SLOs
+    topic_slos = db.get_syllabus_by_subject(selected_code, {'term': term_val, 'topic': topic['topic_number']})
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        view = st.radio("View", ["Cards", "Table"], horizontal=True)
+    with col2:
+        page_size = st.selectbox("SLOs per page", PAGE_SIZES)
+    
+    pages = max(1, -(-len(topic_slos) // page_size))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                           key=f"slo_page_{selected_code}_{term_val}_{topic['topic_id']}_{page_size}")
+    first = (page - 1) * page_size
+    page_slos = topic_slos[first:first + page_size]
+    
+    if view == "Table":
+        st.dataframe([{
+            '#': idx,
+            'Objective': slo['learning_objective_text'],
+            'Priority': slo.get('priority_level'),
+            'Domain': slo.get('domain_code'),
+            'Competency': slo.get('competency_level'),
+            'Term': slo.get('term'),
+        } for idx, slo in enumerate(page_slos, first + 1)], hide_index=True, use_container_width=True)
+        return
+    
+    show_bulk_actions(db, teacher_id, selected_code, topic, topic_slos, page_slos)
+    
+    icons = {'Mk': '🔴', 'Dk': '🟡', 'Nk': '🟢'}
+    for idx, slo in enumerate(page_slos, first + 1):
+        col_select, col_text, col_toggle = st.columns([1, 12, 2])
+        with col_select:
+            st.checkbox("Select", key=f"select_{slo['syllabus_id']}", label_visibility="collapsed")
+        with col_text:
+            st.markdown(f"{icons.get(slo.get('priority_level'), '⚪')} **SLO {idx}:** {slo['learning_objective_text']}")
+        with col_toggle:
+            expanded = st.toggle("Details", key=f"detail_{slo['syllabus_id']}")
+        
+        if expanded:
+            with st.container(border=True):
+                show_slo_detail(db, teacher_id, selected_code, slo)
+
+def show_bulk_actions(db, teacher_id, selected_code, topic, topic_slos, page_slos):
+    """Plan or complete many SLOs at once with one transactional write"""
+    with st.form(f"bulk_{selected_code}_{topic['topic_id']}"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            scope = st.selectbox("Apply to", ["Selected SLOs", "This page", "Whole topic"])
+        with col2:
+            priorities = st.multiselect("Priorities", ['Mk', 'Dk', 'Nk'], default=['Mk', 'Dk', 'Nk'])
+        with col3:
+            action = st.selectbox("Action", list(BULK_ACTIONS))
+        submitted = st.form_submit_button("⚡ Apply to all", use_container_width=True)
+    
+    if not submitted:
+        return
+    
+    if scope == "Selected SLOs":
+        chosen = [s for s in topic_slos if st.session_state.get(f"select_{s['syllabus_id']}")]
+    else:
+        chosen = page_slos if scope == "This page" else topic_slos
+    ids = [s['syllabus_id'] for s in chosen if s.get('priority_level') in priorities]
+    if not ids:
+        st.warning("No SLOs match - tick some SLOs or widen the priorities")
+        return
+    
+    plan_type = BULK_ACTIONS[action]
+    if plan_type:
+        db.plan_slos(teacher_id, selected_code, ids, plan_type)
+        st.success(f"✅ {len(ids)} SLOs added to the plan!")
+    else:
+        added = db.mark_slos_complete(teacher_id, selected_code, ids)
+        st.success(f"✅ {added} SLOs marked complete!"
+                   + (f" ({len(ids) - added} were already complete)" if added < len(ids) else ""))
+
+@st.fragment
+def show_slo_detail(db, teacher_id, selected_code, slo):
+    """Classification, methods, outcomes and planning buttons for one SLO
+
+    A fragment, so its buttons rerun only this card, not the whole page.
+    """
+    st.info(slo['learning_objective_text'])
     
     col1, col2, col3 = st.columns(3)
+    
     with col1:
-        st.metric("🔴 Must Know", mk)
+        st.markdown("**🎯 Classification:**")
+        domain_code = slo.get('domain_code', 'CC')
+        st.markdown(f"**C3:** {domain_code} - {get_abbr_full(domain_code, 'domain')}")
+        
+        priority = slo.get('priority_level', 'Mk')
+        icons = {'Mk': '🔴', 'Dk': '🟡', 'Nk': '🟢'}
+        st.markdown(f"**D3:** {icons.get(priority)} {priority} - {get_abbr_full(priority, 'priority')}")
+        
+        comp = slo.get('competency_level', 'Kh')
+        st.markdown(f"**E3:** {comp} - {get_abbr_full(comp, 'competency')}")
+        
+        st.markdown(f"**I3:** Term {slo.get('term')}")
+    
     with col2:
-        st.metric("🟡 Desirable", dk)
+        st.markdown("**📚 Teaching & Assessment:**")
+        methods = slo.teaching_methods
+        st.markdown(f"**F3:** {', '.join(methods) if methods else 'Lecture'}")
+        
+        assess = slo.assessment_methods
+        st.markdown(f"**G3:** {', '.join(assess) if assess else 'Written'}")
+        
+        st.markdown(f"**H3:** {slo.get('assessment_type_full')}")
+    
     with col3:
-        st.metric("🟢 Nice to Know", nk)
+        st.markdown("**📊 Integration & Outcomes:**")
+        integ = slo.integrations
+        st.markdown(f"**J3:** {', '.join(integ) if integ else 'None'}")
+        
+        st.markdown(f"**CO:** {slo.get('course_outcome')}")
+        st.markdown(f"**PO:** {slo.get('programme_outcome')}")
     
     st.markdown("---")
     
-    # Display SLOs
-    for idx, slo in enumerate(topics[topic], 1):
-        with st.expander(f"📝 SLO {idx}: {slo['learning_objective_text'][:100]}..."):
-            st.info(slo['learning_objective_text'])
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown("**🎯 Classification:**")
-                domain_code = slo.get('domain_code', 'CC')
-                st.markdown(f"**C3:** {domain_code} - {get_abbr_full(domain_code, 'domain')}")
-                
-                priority = slo.get('priority_level', 'Mk')
-                icons = {'Mk': '🔴', 'Dk': '🟡', 'Nk': '🟢'}
-                st.markdown(f"**D3:** {icons.get(priority)} {priority} - {get_abbr_full(priority, 'priority')}")
-                
-                comp = slo.get('competency_level', 'Kh')
-                st.markdown(f"**E3:** {comp} - {get_abbr_full(comp, 'competency')}")
-                
-                st.markdown(f"**I3:** Term {slo.get('term')}")
-            
-            with col2:
-                st.markdown("**📚 Teaching & Assessment:**")
-                methods = json.loads(slo.get('teaching_methods_codes', '[]'))
-                st.markdown(f"**F3:** {', '.join(methods) if methods else 'Lecture'}")
-                
-                assess = json.loads(slo.get('assessment_methods_codes', '[]'))
-                st.markdown(f"**G3:** {', '.join(assess) if assess else 'Written'}")
-                
-                st.markdown(f"**H3:** {slo.get('assessment_type_full')}")
-            
-            with col3:
-                st.markdown("**📊 Integration & Outcomes:**")
-                integ = json.loads(slo.get('integration_codes', '[]')) if slo.get('integration_codes') else []
-                st.markdown(f"**J3:** {', '.join(integ) if integ else 'None'}")
-                
-                st.markdown(f"**CO:** {slo.get('course_outcome')}")
-                st.markdown(f"**PO:** {slo.get('programme_outcome')}")
-            
-            st.markdown("---")
-            
-            # PLANNING BUTTONS - NEW!
-            col_a, col_b, col_c = st.columns(3)
-            
-            with col_a:
-                if st.button(f"📅 Select for Today's Class", key=f"today_{slo['syllabus_id']}"):
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO planned_slos 
-                        (teacher_id, subject_code, syllabus_id, plan_type, plan_date)
-                        VALUES (?, ?, ?, 'today', date('now'))
-                    ''', (teacher_id, selected_code, slo['syllabus_id']))
-                    conn.commit()
-                    conn.close()
-                    st.success("✅ Added to today's plan!")
-            
-            with col_b:
-                if st.button(f"📆 Select for Next Month", key=f"next_{slo['syllabus_id']}"):
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO planned_slos 
-                        (teacher_id, subject_code, syllabus_id, plan_type, plan_date)
-                        VALUES (?, ?, ?, 'next_month', date('now'))
-                    ''', (teacher_id, selected_code, slo['syllabus_id']))
-                    conn.commit()
-                    conn.close()
-                    st.success("✅ Added to next month's plan!")
-            
-            with col_c:
-                if st.button(f"✅ Mark Complete", key=f"complete_{slo['syllabus_id']}"):
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO syllabus_coverage_log 
-                        (teacher_id, subject_code, syllabus_id, coverage_date, coverage_status)
-                        VALUES (?, ?, ?, date('now'), 'completed')
-                    ''', (teacher_id, selected_code, slo['syllabus_id']))
-                    conn.commit()
-                    conn.close()
-                    st.success("✅ Marked complete!")
+    # PLANNING BUTTONS - NEW!
+    col_a, col_b, col_c = st.columns(3)
+    
+    with col_a:
+        if st.button(f"📅 Select for Today's Class", key=f"today_{slo['syllabus_id']}"):
+            db.plan_slos(teacher_id, selected_code, [slo['syllabus_id']], 'today')
+            st.success("✅ Added to today's plan!")
+    
+    with col_b:
+        if st.button(f"📆 Select for Next Month", key=f"next_{slo['syllabus_id']}"):
+            db.plan_slos(teacher_id, selected_code, [slo['syllabus_id']], 'next_month')
+            st.success("✅ Added to next month's plan!")
+    
+    with col_c:
+        if st.button(f"✅ Mark Complete", key=f"complete_{slo['syllabus_id']}"):
+            if db.mark_slos_complete(teacher_id, selected_code, [slo['syllabus_id']]):
+                st.success("✅ Marked complete!")
+            else:
+                st.info("Already marked complete")
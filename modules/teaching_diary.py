@@ -19,28 +19,20 @@ def show(db, teacher_id, academic_year):
         period = st.number_input("🕐 Period", 1, 10, 1)
         term = st.selectbox("📆 Term", ["I", "II", "III"])
         
-        # Get SLOs for subject
-        slos = db.get_syllabus_by_subject(selected_code, {'term': term})
+        # Get topics taught in this term
+        topics = db.get_topics(selected_code, term)
         
-        if not slos:
+        if not topics:
             st.warning(f"No SLOs found for Term {term}")
             st.form_submit_button("Save")
             return
         
-        # Group by topic
-        topics = {}
-        for slo in slos:
-            t = slo.get('topic_number', 'General')
-            if t not in topics:
-                topics[t] = []
-            topics[t].append(slo)
-        
-        topic_list = list(topics.keys())
-        topic = st.selectbox("📑 Topic Covered", topic_list)
+        topic = st.selectbox("📑 Topic Covered", topics, format_func=lambda t: t['display_name'])
+        topic_slos = db.get_syllabus_by_subject(selected_code, {'term': term, 'topic': topic['topic_number']})
         
         # SLO selection
         slo_opts = {f"SLO {i+1}: {s['learning_objective_text'][:80]}...": s['syllabus_id'] 
-                   for i, s in enumerate(topics[topic])}
+                   for i, s in enumerate(topic_slos)}
         
         sel_slos = st.multiselect(
             "✅ SLOs Completed",
@@ -52,22 +44,13 @@ def show(db, teacher_id, academic_year):
         
         if st.form_submit_button("💾 Save Entry", use_container_width=True):
             if sel_slos:
-                conn = db.get_connection()
-                cursor = conn.cursor()
-                
-                # Mark SLOs complete
-                for slo_label in sel_slos:
-                    slo_id = slo_opts[slo_label]
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO syllabus_coverage_log 
-                        (teacher_id, subject_code, syllabus_id, coverage_date, coverage_status)
-                        VALUES (?, ?, ?, ?, 'completed')
-                    ''', (teacher_id, selected_code, slo_id, entry_date))
-                
-                conn.commit()
-                conn.close()
+                # Mark SLOs complete; ones already completed are ignored
+                added = db.mark_slos_complete(teacher_id, selected_code,
+                                              [slo_opts[label] for label in sel_slos], entry_date)
                 
-                st.success(f"✅ {len(sel_slos)} SLOs marked complete!")
+                already = len(sel_slos) - added
+                st.success(f"✅ {added} SLOs marked complete!"
+                           + (f" ({already} were already complete)" if already else ""))
                 st.balloons()
             else:
                 st.warning("Please select at least one SLO")
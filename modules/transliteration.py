@@ -0,0 +1,110 @@
+"""
+Transliteration helpers for spelling-tolerant syllabus search
+Folds Devanagari, IAST and ad-hoc romanizations of Sanskrit terms to one key
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Set
+
+# Devanagari -> Harvard-Kyoto-like Latin, before folding
+DEVANAGARI_VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ii', 'उ': 'u', 'ऊ': 'uu', 'ऋ': 'ri', 'ॠ': 'rii',
+    'ऌ': 'li', 'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au', 'ॐ': 'om',
+}
+DEVANAGARI_MATRAS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ii', 'ु': 'u', 'ू': 'uu', 'ृ': 'ri', 'ॄ': 'rii',
+    'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au',
+}
+DEVANAGARI_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+    'च': 'c', 'छ': 'ch', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v', 'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h', 'ळ': 'l',
+}
+DEVANAGARI_SIGNS = {'ं': 'm', 'ँ': 'n', 'ः': 'h', '्': '', '़': '', 'ऽ': ''}
+DEVANAGARI_DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+# IAST letters whose plain-ASCII spelling is not just the base letter
+IAST_LETTERS = {'ṛ': 'ri', 'ṝ': 'rii', 'ḷ': 'li', 'ś': 'sh', 'ṣ': 'sh'}
+
+# Common English words in objectives; never indexed or searched
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is', 'it',
+    'its', 'of', 'on', 'or', 'the', 'their', 'to', 'with', 'which', 'each', 'etc',
+    'according', 'describe', 'explain', 'discuss', 'define', 'enumerate', 'list', 'various',
+}
+
+# Letters plus Devanagari vowel signs and combining accents (not matched by \w)
+TOKEN_RE = re.compile(r'(?:[^\W_]|[\u0900-\u097F\u0300-\u036F])+')
+ASPIRATE_RE = re.compile(r'([kgcjtdpbs])h')
+REPEAT_RE = re.compile(r'(.)\1+')
+
+def devanagari_to_latin(text: str) -> str:
+    """Romanize Devanagari, leaving other characters as they are"""
+    out = []
+    inherent = False  # last output was a consonant still carrying its 'a'
+    for ch in text:
+        if ch in DEVANAGARI_CONSONANTS:
+            out.append(DEVANAGARI_CONSONANTS[ch] + 'a')
+            inherent = True
+            continue
+        if ch in DEVANAGARI_MATRAS or ch == '्':
+            if inherent:
+                out[-1] = out[-1][:-1]
+            out.append(DEVANAGARI_MATRAS.get(ch, ''))
+        elif ch in DEVANAGARI_VOWELS:
+            out.append(DEVANAGARI_VOWELS[ch])
+        elif ch in DEVANAGARI_SIGNS:
+            out.append(DEVANAGARI_SIGNS[ch])
+        else:
+            out.append(DEVANAGARI_DIGITS.get(ch, ch))
+        inherent = False
+    return ''.join(out)
+
+@lru_cache(maxsize=65536)
+def term_key(word: str) -> str:
+    """Fold one word to its search key
+
+    Vata, Vāta, Waata and वात all become 'vat': diacritics are dropped,
+    aspirates and doubled letters collapsed (sh/ṣ/ś -> s, ee -> i) and a
+    final short 'a' removed.
+    """
+    word = devanagari_to_latin(word.lower())
+    word = ''.join(IAST_LETTERS.get(ch, ch) for ch in word)
+    word = unicodedata.normalize('NFKD', word)
+    word = ''.join(ch for ch in word if ch.isascii() and ch.isalnum())
+    word = word.replace('x', 'ks').replace('w', 'v').replace('ee', 'i').replace('oo', 'u')
+    word = ASPIRATE_RE.sub(r'\1', word)
+    word = REPEAT_RE.sub(r'\1', word)
+    if len(word) > 3 and word.endswith('a'):
+        word = word[:-1]
+    return word
+
+def text_terms(text: str) -> List[str]:
+    """Search keys of every meaningful word in text, in order"""
+    terms = []
+    for word in TOKEN_RE.findall(text or ''):
+        if word.lower() in STOPWORDS:
+            continue
+        key = term_key(word)
+        if len(key) >= 2:
+            terms.append(key)
+    return terms
+
+def trigrams(term: str) -> Set[str]:
+    """Character trigrams of a key, padded so short keys still have some"""
+    padded = f'${term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def highlight(text: str, terms: Set[str]) -> str:
+    """Wrap the words of text whose key is in terms in **bold**"""
+    def mark(match):
+        word = match.group(0)
+        if word.lower() not in STOPWORDS and term_key(word) in terms:
+            return f'**{word}**'
+        return word
+    return TOKEN_RE.sub(mark, text or '')
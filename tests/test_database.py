@@ -0,0 +1,320 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from database import MIGRATIONS, Database, month_range
+
+def add_slos(db, rows):
+    """Insert (topic_number, learning_objective_text, priority_level, term) rows for S1"""
+    db.write(lambda conn: conn.executemany('''
+        INSERT INTO syllabus_master
+        (subject_code, subject_name, year, topic_number, learning_objective_text,
+         priority_level, term, status)
+        VALUES ('S1', 'Subject', 1, ?, ?, ?, ?, 'active')
+    ''', rows))
+
+def add_syllabus(db, count):
+    add_slos(db, [('Topic 1', f'objective {i}', 'Mk', 'I') for i in range(count)])
+
+def count_syllabus(db):
+    with db.connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM syllabus_master').fetchone()[0]
+
+@pytest.fixture
+def db():
+    return Database(':memory:')
+
+def test_memory_database_handles_concurrent_sessions(db):
+    """Readers and the writer wait on each other instead of failing with 'table is locked'"""
+    add_syllabus(db, 400)
+    teacher_id = db.create_teacher('teacher', 'secret', 'Teacher')
+    errors = []
+    
+    def session(n):
+        try:
+            for i in range(20):
+                db.mark_slos_complete(teacher_id, 'S1', [n * 20 + i + 1])
+                db.get_coverage_stats(teacher_id, 'S1')
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert db.get_coverage_stats(teacher_id, 'S1')['covered'] == 400
+
+def test_memory_databases_are_private():
+    first, second = Database(':memory:'), Database(':memory:')
+    add_syllabus(first, 3)
+    assert count_syllabus(first) == 3
+    assert count_syllabus(second) == 0
+
+def coverage_summary(db):
+    with db.connection() as conn:
+        return sorted(tuple(row) for row in conn.execute(
+            'SELECT * FROM coverage_summary WHERE covered > 0'))
+
+def assert_summary_matches_recount(db):
+    live = coverage_summary(db)
+    db.rebuild_coverage_summary()
+    assert coverage_summary(db) == live
+
+def log_event(db, teacher_id, syllabus_id, category):
+    """A Teaching Diary coverage row, which carries its LH/NLHT/NLHP category"""
+    db.write(lambda conn: conn.execute('''
+        INSERT INTO syllabus_coverage_log
+        (teacher_id, subject_code, syllabus_id, category, coverage_date, coverage_status)
+        VALUES (?, 'S1', ?, ?, '2025-07-01', 'completed')
+    ''', (teacher_id, syllabus_id, category)))
+
+def delete_event(db, teacher_id, syllabus_id, category):
+    db.write(lambda conn: conn.execute('''
+        DELETE FROM syllabus_coverage_log
+        WHERE teacher_id = ? AND syllabus_id = ? AND category IS ?
+    ''', (teacher_id, syllabus_id, category)))
+
+def test_coverage_summary_triggers_match_a_recount(db):
+    add_slos(db, [('Topic 1', 'Tridosha', 'Mk', 'I'), ('Topic 1', 'Agni', 'Dk', 'I'),
+                  ('Topic 2', 'Ojas', 'Mk', 'II'), ('Topic 2', 'Ama', 'Nk', 'II')])
+    first = db.create_teacher('first', 'secret', 'First')
+    second = db.create_teacher('second', 'secret', 'Second')
+    
+    db.mark_slos_complete(first, 'S1', [1, 2, 3])
+    db.mark_slos_complete(second, 'S1', [3])
+    assert_summary_matches_recount(db)
+    
+    # A second category for a covered SLO does not count it twice
+    log_event(db, first, 1, 'LH')
+    log_event(db, first, 4, 'LH')
+    log_event(db, first, 4, 'NLHT')
+    assert_summary_matches_recount(db)
+    assert db.get_coverage_stats(first, 'S1')['covered'] == 4
+    
+    # The SLO stays covered until its last category row is deleted
+    delete_event(db, first, 4, 'LH')
+    assert_summary_matches_recount(db)
+    assert db.get_coverage_stats(first, 'S1')['covered'] == 4
+    delete_event(db, first, 4, 'NLHT')
+    delete_event(db, first, 2, None)
+    assert_summary_matches_recount(db)
+    assert db.get_coverage_stats(first, 'S1')['covered'] == 2
+    assert db.get_coverage_stats(second, 'S1')['covered'] == 1
+    
+    # Reclassifying a logged row changes no counts
+    db.write(lambda conn: conn.execute(
+        "UPDATE syllabus_coverage_log SET category = 'NLHP' WHERE teacher_id = ? AND category = 'LH'",
+        (first,)))
+    assert_summary_matches_recount(db)
+
+def test_coverage_summary_rebuild_follows_reclassified_slos(db):
+    """A re-import that changes an SLO's priority is repaired by rebuild_coverage_summary"""
+    add_slos(db, [('Topic 1', 'Tridosha', 'Mk', 'I'), ('Topic 1', 'Agni', 'Mk', 'I')])
+    teacher_id = db.create_teacher('teacher', 'secret', 'Teacher')
+    db.mark_slos_complete(teacher_id, 'S1', [1])
+    db.write(lambda conn: conn.execute(
+        "UPDATE syllabus_master SET priority_level = 'Dk' WHERE syllabus_id = 1"))
+    db.rebuild_coverage_summary()
+    db.bump_syllabus_version()
+    
+    by_priority = db.get_coverage_stats(teacher_id, 'S1')['by_priority']
+    assert by_priority['Dk']['covered'] == 1
+    assert by_priority['Mk']['covered'] == 0
+
+def test_get_topics(db):
+    add_slos(db, [
+        ('Topic-1', 'Tridosha', 'Mk', 'I'),
+        ('Q3 LAQ - answer any two', 'Exam note', 'Mk', 'I'),
+        ('Topic 2', 'Agni', 'Dk', 'II'),
+        ('Topic 1', 'Ojas', 'Nk', 'II'),
+        (None, 'Prakriti', 'Mk', 'I'),
+        ('Topic 2', 'Ama', 'Mk', 'I'),
+    ])
+    db.rebuild_topics()
+    
+    topics = db.get_topics('S1')
+    # Headings in workbook order, repeated names numbered, non-headings last
+    assert [t['display_name'] for t in topics] == [
+        'Topic 1', 'Topic 2', 'Topic 1 (2)', 'General', 'Other SLOs']
+    topic_2 = topics[1]
+    assert (topic_2['terms'], topic_2['slo_count'],
+            topic_2['mk_count'], topic_2['dk_count']) == ('I,II', 2, 1, 1)
+    
+    term_2 = db.get_topics('S1', 'II')
+    assert [(t['display_name'], t['slo_count'], t['dk_count'], t['nk_count']) for t in term_2] == [
+        ('Topic 2', 1, 1, 0), ('Topic 1 (2)', 1, 0, 1)]
+    assert db.get_topics('S2') == []
+
+def test_syllabus_topic_filter_is_cached_separately(db):
+    """{'topic': None} (SLOs without a topic) must not share a cache entry with no filter"""
+    add_slos(db, [('Topic 1', 'Tridosha', 'Mk', 'I'), (None, 'Prakriti', 'Mk', 'I')])
+    assert len(db.get_syllabus_by_subject('S1')) == 2
+    untitled = db.get_syllabus_by_subject('S1', {'topic': None})
+    assert [slo['learning_objective_text'] for slo in untitled] == ['Prakriti']
+    assert len(db.get_syllabus_by_subject('S1', {'topic': 'Topic 1'})) == 1
+
+def migration_plans(output):
+    """{version: (before, after)} from the plans migrate() prints"""
+    plans, lines = {}, output.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith('✓ Migration ') and i + 2 < len(lines) and 'before:' in lines[i + 1]:
+            version = int(line.split()[2].rstrip(':'))
+            plans[version] = (lines[i + 1], lines[i + 2])
+    return plans
+
+def test_migrations_use_their_indexes(tmp_path, capsys):
+    """Each migration's check query plans with the index it adds"""
+    db_path = str(tmp_path / 'app.db')
+    Database(db_path)
+    plans = migration_plans(capsys.readouterr().out)
+    
+    assert sorted(plans) == [m['version'] for m in MIGRATIONS]
+    for migration in MIGRATIONS:
+        before, after = plans[migration['version']]
+        assert migration['expect'] in after, (migration['version'], after)
+    # Indexes on existing tables were not used before their migration ran
+    for migration in MIGRATIONS[:4]:
+        assert migration['expect'] not in plans[migration['version']][0]
+    
+    assert Database(db_path).migrate() == []  # reopening applies nothing
+
+def test_unique_event_migration_compacts_duplicates(tmp_path):
+    """Migration 10 on a log with repeat clicks keeps the earliest row of each event"""
+    db_path = str(tmp_path / 'app.db')
+    db = Database(db_path)
+    add_slos(db, [('Topic 1', 'Tridosha', 'Mk', 'I'), ('Topic 1', 'Agni', 'Dk', 'I')])
+    teacher_id = db.create_teacher('teacher', 'secret', 'Teacher')
+    
+    # The log as it was before migration 10: no unique index, duplicates allowed
+    conn = sqlite3.connect(db_path)
+    conn.execute('DROP INDEX idx_coverage_unique_event')
+    conn.execute('CREATE INDEX idx_coverage_teacher_slo ON syllabus_coverage_log (teacher_id, syllabus_id)')
+    conn.executemany('''
+        INSERT INTO syllabus_coverage_log
+        (teacher_id, subject_code, syllabus_id, category, coverage_date, coverage_status)
+        VALUES (?, 'S1', ?, ?, ?, 'completed')
+    ''', [(teacher_id, 1, None, '2025-07-03'), (teacher_id, 1, None, '2025-07-01'),
+          (teacher_id, 1, None, '2025-07-02'), (teacher_id, 1, 'LH', '2025-07-05'),
+          (teacher_id, 1, 'LH', '2025-07-04'), (teacher_id, 2, 'LH', '2025-07-06')])
+    conn.execute('PRAGMA user_version = 9')
+    conn.commit()
+    conn.close()
+    
+    db = Database(db_path)
+    with db.connection() as conn:
+        rows = conn.execute('''
+            SELECT syllabus_id, category, coverage_date FROM syllabus_coverage_log
+            ORDER BY syllabus_id, coverage_date
+        ''').fetchall()
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list('syllabus_coverage_log')")}
+    assert [tuple(row) for row in rows] == [
+        (1, None, '2025-07-01'), (1, 'LH', '2025-07-04'), (2, 'LH', '2025-07-06')]
+    assert 'idx_coverage_unique_event' in indexes
+    assert 'idx_coverage_teacher_slo' not in indexes
+    assert_summary_matches_recount(db)
+    
+    # Repeat clicks are now refused, including those without a category
+    with pytest.raises(sqlite3.IntegrityError):
+        log_event(db, teacher_id, 1, None)
+    with pytest.raises(sqlite3.IntegrityError):
+        log_event(db, teacher_id, 2, 'LH')
+    assert db.mark_slos_complete(teacher_id, 'S1', [1]) == 0
+    assert db.get_coverage_stats(teacher_id, 'S1')['covered'] == 2
+
+def test_search_syllabus(db):
+    add_slos(db, [('Topic 1', 'Describe the functions of Vata dosha', 'Mk', 'I'),
+                  ('Topic 1', 'Explain Pitta and Agni', 'Mk', 'I'),
+                  ('Topic 2', 'Define Vata prakriti', 'Nk', 'II')])
+    db.write(lambda conn: conn.execute(
+        "UPDATE syllabus_master SET status = 'inactive' WHERE syllabus_id = 3"))
+    db.rebuild_term_index()
+    
+    # Full-text match, kept current by the syllabus_fts triggers
+    results = db.search_syllabus('S1', 'Vata dosha')
+    assert [(r['syllabus_id'], r['match']) for r in results] == [(1, 'exact')]
+    assert results[0]['snippet'] == 'Describe the functions of **Vata** **dosha**'
+    assert db.search_syllabus('S2', 'vata') == []
+    
+    # Misspelt or in Devanagari: nothing matches exactly, the fuzzy index answers
+    results = db.search_syllabus('S1', 'pita agni')
+    assert [(r['syllabus_id'], r['match']) for r in results] == [(2, 'fuzzy')]
+    assert results[0]['snippet'] == 'Explain **Pitta** and **Agni**'
+    assert [r['syllabus_id'] for r in db.search_syllabus(None, 'वात')] == [1]
+    assert db.search_syllabus('S1', 'xyzzy') == []
+    assert db.search_syllabus('S1', '') == []
+
+@pytest.mark.parametrize('year, month, bounds', [
+    (2025, 1, ('2025-01-01', '2025-02-01')),
+    (2024, 2, ('2024-02-01', '2024-03-01')),
+    (2025, 11, ('2025-11-01', '2025-12-01')),
+    (2025, 12, ('2025-12-01', '2026-01-01')),
+])
+def test_month_range(year, month, bounds):
+    assert month_range(year, month) == bounds
+
+def test_coverage_between_a_month_range(db):
+    """The half-open end takes all of the last day and none of the next month"""
+    add_syllabus(db, 4)
+    teacher_id = db.create_teacher('teacher', 'secret', 'Teacher')
+    db.write(lambda conn: conn.executemany('''
+        INSERT INTO syllabus_coverage_log
+        (teacher_id, subject_code, syllabus_id, coverage_date, coverage_status)
+        VALUES (?, 'S1', ?, ?, 'completed')
+    ''', [(teacher_id, 1, '2025-11-30'), (teacher_id, 2, '2025-12-01'),
+          (teacher_id, 3, '2025-12-31 23:59:59'), (teacher_id, 4, '2026-01-01')]))
+    
+    december = db.get_coverage_between(teacher_id, 'S1', *month_range(2025, 12))
+    assert [slo['syllabus_id'] for slo in december] == [2, 3]
+    january = db.get_coverage_between(teacher_id, 'S1', *month_range(2026, 1))
+    assert [slo['syllabus_id'] for slo in january] == [4]
+
+def planned(db, teacher_id):
+    with db.connection() as conn:
+        return [tuple(row) for row in conn.execute('''
+            SELECT syllabus_id, plan_type, plan_date FROM planned_slos
+            WHERE teacher_id = ? ORDER BY syllabus_id, plan_type
+        ''', (teacher_id,))]
+
+def test_plan_and_mark_slos_in_one_transaction(db):
+    add_syllabus(db, 4)
+    teacher_id = db.create_teacher('teacher', 'secret', 'Teacher')
+    
+    assert db.plan_slos(teacher_id, 'S1', [1, 2], 'today', '2025-07-01') == 2
+    assert db.plan_slos(teacher_id, 'S1', [2, 3], 'today', '2025-07-02') == 2
+    assert db.plan_slos(teacher_id, 'S1', [2], 'next_month', '2025-08-01') == 1
+    assert planned(db, teacher_id) == [
+        (1, 'today', '2025-07-01'), (2, 'next_month', '2025-08-01'),
+        (2, 'today', '2025-07-02'), (3, 'today', '2025-07-02')]
+    
+    assert db.mark_slos_complete(teacher_id, 'S1', [1, 2], '2025-07-01') == 2
+    # Already complete: not counted again, and the first date stands
+    assert db.mark_slos_complete(teacher_id, 'S1', [2, 3], '2025-07-05') == 1
+    assert db.mark_slos_complete(teacher_id, 'S1', [1, 2, 3]) == 0
+    assert db.mark_slos_complete(teacher_id, 'S1', []) == 0
+    assert [(slo['syllabus_id'], slo['coverage_date']) for slo in
+            db.get_coverage_between(teacher_id, 'S1', '2025-07-01', '2025-08-01')] == [
+        (1, '2025-07-01'), (2, '2025-07-01'), (3, '2025-07-05')]
+    
+    # One bad row rolls back the whole batch
+    with pytest.raises(sqlite3.IntegrityError):
+        db.mark_slos_complete(teacher_id, 'S1', [4, None])
+    with pytest.raises(sqlite3.IntegrityError):
+        db.plan_slos(teacher_id, 'S1', [4, None], 'today', '2025-07-09')
+    assert db.get_coverage_stats(teacher_id, 'S1')['covered'] == 3
+    assert len(planned(db, teacher_id)) == 4
+
+@pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'),
+                    reason="set TEST_DATABASE_URL to an empty PostgreSQL database")
+def test_postgres_database():
+    db = Database(os.environ['TEST_DATABASE_URL'])
+    version = db.syllabus_version()
+    assert db.bump_syllabus_version() == version + 1
+    assert db.bump_syllabus_version() == version + 2
+    add_syllabus(db, 3)
+    db.rebuild_term_index()
+    assert db.search_syllabus('S1', 'objectve')  # no FTS5: answered by the fuzzy index
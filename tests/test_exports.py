@@ -0,0 +1,29 @@
+import io
+
+import pytest
+from openpyxl import load_workbook
+
+from exports import csv_file, xlsx_file
+
+download_data_util = pytest.importorskip('streamlit.runtime.download_data_util')
+
+ROWS = [('syllabus_id', 'learning_objective_text'), (1, 'Vata, Pitta'), (2, 'Kapha')]
+
+def to_download_bytes(data) -> bytes:
+    """What st.download_button does with a data callable's return value"""
+    data_as_bytes, _ = download_data_util.convert_data_to_bytes_and_infer_mime(
+        data, unsupported_error=TypeError(f'unsupported type: {type(data)}'))
+    return data_as_bytes
+
+def test_csv_file_is_a_streamlit_download():
+    data = to_download_bytes(csv_file(iter(ROWS)))
+    assert data.decode('utf-8') == 'syllabus_id,learning_objective_text\n1,"Vata, Pitta"\n2,Kapha\n'
+
+def test_xlsx_file_is_a_streamlit_download():
+    data = to_download_bytes(xlsx_file(iter(ROWS), sheet_name='Completed SLOs'))
+    sheet = load_workbook(io.BytesIO(data))['Completed SLOs']
+    assert [tuple(row) for row in sheet.iter_rows(values_only=True)] == ROWS
+
+def test_empty_export_keeps_header():
+    data = to_download_bytes(csv_file(iter(ROWS[:1])))
+    assert data == b'syllabus_id,learning_objective_text\n'
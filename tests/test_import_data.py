@@ -0,0 +1,99 @@
+import pytest
+
+from database import Database
+from import_data import hash_records, sync_sheet, write_sheet
+
+def make_records(count, subject_code='S1'):
+    """Hashed records as parse_sheet + hash_records would give them"""
+    return hash_records([
+        (i, (subject_code, 'Subject', 1, 'Topic 1', f'objective {i}',
+             'CK', 'Cognitive / Knowledge', 'Mk', 'Must know', 'K', 'Knows',
+             '["Lecture"]', '["Lecture"]', '["Written"]', '["Written"]',
+             'F', 'Formative', 'I', '[]', '[]', 'Topic 1', 'PO1, PO2'))
+        for i in range(count)
+    ])
+
+def full_import(db, records):
+    conn = db.get_connection()
+    conn.isolation_level = None
+    try:
+        write_sheet(conn, records)
+    finally:
+        conn.close()
+
+def reimport(db, records):
+    """sync_sheet plus the rebuilds import_excel runs after the sheets"""
+    conn = db.get_connection()
+    conn.isolation_level = None
+    try:
+        result = sync_sheet(conn, 'LMS1_S1', 'S1', records)
+    finally:
+        conn.close()
+    db.rebuild_coverage_summary()
+    db.bump_syllabus_version()
+    return result
+
+def syllabus_ids(db, status='active'):
+    with db.connection() as conn:
+        return [row[0] for row in conn.execute(
+            'SELECT syllabus_id FROM syllabus_master WHERE status = ? ORDER BY syllabus_id',
+            (status,))]
+
+def logged_ids(db, table='syllabus_coverage_log'):
+    with db.connection() as conn:
+        return sorted(row[0] for row in conn.execute(f'SELECT syllabus_id FROM {table}'))
+
+@pytest.fixture
+def db():
+    return Database(':memory:')
+
+def test_reimport_is_idempotent(db):
+    records = make_records(5)
+    full_import(db, records)
+    ids = syllabus_ids(db)
+    teacher_id = db.create_teacher('teacher', 'secret', 'Teacher')
+    db.mark_slos_complete(teacher_id, 'S1', ids[:2])
+    stats = db.get_coverage_stats(teacher_id, 'S1')
+    
+    assert reimport(db, records) == (0, 0, 0, [])
+    assert reimport(db, records) is None  # sheet unchanged, skipped
+    assert syllabus_ids(db) == ids
+    assert db.get_coverage_stats(teacher_id, 'S1') == stats
+
+def test_reimport_keeps_history_of_duplicate_copies(db):
+    """Coverage and plans on the copy a second full import left move to the copy that stays"""
+    records = make_records(5)
+    full_import(db, records)
+    full_import(db, records)
+    ids = syllabus_ids(db)
+    first, second = ids[:5], ids[5:]
+    teacher_id = db.create_teacher('teacher', 'secret', 'Teacher')
+    db.mark_slos_complete(teacher_id, 'S1', [second[0], first[1], second[1]])
+    db.plan_slos(teacher_id, 'S1', [second[2], first[3], second[3]], 'today')
+    
+    assert reimport(db, records) == (0, 0, 5, [])
+    assert syllabus_ids(db) == first
+    assert syllabus_ids(db, 'inactive') == second
+    # second[1] repeated an event already logged on first[1]: dropped, not duplicated
+    assert logged_ids(db) == [first[0], first[1]]
+    assert logged_ids(db, 'planned_slos') == [first[2], first[3]]
+    assert db.get_coverage_stats(teacher_id, 'S1')['covered'] == 2
+    
+    single = Database(':memory:')
+    full_import(single, records)
+    single_teacher = single.create_teacher('teacher', 'secret', 'Teacher')
+    single.mark_slos_complete(single_teacher, 'S1', syllabus_ids(single)[:2])
+    assert db.get_coverage_stats(teacher_id, 'S1') == single.get_coverage_stats(single_teacher, 'S1')
+
+def test_removed_slo_keeps_its_history(db):
+    """An SLO dropped from the sheet is retired with its coverage, not repointed"""
+    records = make_records(3)
+    full_import(db, records)
+    ids = syllabus_ids(db)
+    teacher_id = db.create_teacher('teacher', 'secret', 'Teacher')
+    db.mark_slos_complete(teacher_id, 'S1', [ids[2]])
+    
+    assert reimport(db, records[:2]) == (0, 0, 1, [])
+    assert syllabus_ids(db, 'inactive') == [ids[2]]
+    assert logged_ids(db) == [ids[2]]
+    assert db.get_coverage_stats(teacher_id, 'S1')['covered'] == 0
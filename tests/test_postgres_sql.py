@@ -0,0 +1,75 @@
+from database import ServerCursor, ServerRow, postgres_sql
+
+def test_placeholders_become_format_params():
+    assert postgres_sql('SELECT * FROM t WHERE a = ? AND b IN (?, ?)') == \
+        'SELECT * FROM t WHERE a = %s AND b IN (%s, %s)'
+
+def test_question_marks_in_literals_are_kept():
+    assert postgres_sql("SELECT 'why?', 'it''s ?' FROM t WHERE a = ?") == \
+        "SELECT 'why?', 'it''s ?' FROM t WHERE a = %s"
+
+def test_percent_is_escaped_only_with_params():
+    query = "SELECT * FROM t WHERE name LIKE 'Topic%' AND a = ?"
+    assert postgres_sql(query) == "SELECT * FROM t WHERE name LIKE 'Topic%%' AND a = %s"
+    assert postgres_sql("SELECT * FROM t WHERE name LIKE 'Topic%'", False) == \
+        "SELECT * FROM t WHERE name LIKE 'Topic%'"
+
+def test_sqlite_dialect_is_rewritten():
+    assert postgres_sql('CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, a TEXT)', False) == \
+        'CREATE TABLE t (id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, a TEXT)'
+    assert postgres_sql('CREATE TABLE t (a TEXT PRIMARY KEY) WITHOUT ROWID', False) == \
+        'CREATE TABLE t (a TEXT PRIMARY KEY)'
+    assert postgres_sql('BEGIN IMMEDIATE', False) == 'BEGIN'
+    assert postgres_sql('SELECT * FROM t WHERE term IS ?') == \
+        'SELECT * FROM t WHERE term IS NOT DISTINCT FROM %s'
+
+def test_portable_upserts_pass_through():
+    query = '''INSERT INTO app_meta (key, value) VALUES ('syllabus_version', 1)
+               ON CONFLICT (key) DO UPDATE SET value = app_meta.value + 1'''
+    assert postgres_sql(query, False) == query
+
+def test_server_row_acts_like_sqlite_row():
+    row = ServerRow((7, 'Mk'), {'syllabus_id': 0, 'priority_level': 1})
+    assert row[0] == 7 and row['priority_level'] == 'Mk'
+    assert row.keys() == ['syllabus_id', 'priority_level']
+    assert dict(zip(row.keys(), row)) == {'syllabus_id': 7, 'priority_level': 'Mk'}
+    assert tuple(row) == (7, 'Mk')
+
+class FakeCursor:
+    """Records what a psycopg cursor would be asked to run"""
+    
+    arraysize = 2
+    description = (('n',),)
+    rowcount = 3
+    
+    def __init__(self):
+        self.calls = []
+        self.rows = [(1,), (2,), (3,)]
+    
+    def execute(self, query, params=None):
+        self.calls.append(('execute', query, params))
+    
+    def executemany(self, query, seq_of_params):
+        self.calls.append(('executemany', query, list(seq_of_params)))
+    
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+def test_server_cursor_translates_statements():
+    fake = FakeCursor()
+    cursor = ServerCursor(fake)
+    assert cursor.execute('SELECT n FROM t WHERE a = ?', (1,)) is cursor
+    cursor.execute("SELECT '?%'")
+    cursor.executemany('INSERT INTO t VALUES (?, ?)', [(1, 2), (3, 4)])
+    assert fake.calls == [
+        ('execute', 'SELECT n FROM t WHERE a = %s', (1,)),
+        ('execute', "SELECT '?%'", None),
+        ('executemany', 'INSERT INTO t VALUES (%s, %s)', [(1, 2), (3, 4)]),
+    ]
+    assert cursor.rowcount == 3 and cursor.description == (('n',),)
+
+def test_server_cursor_fetchmany_defaults_to_arraysize():
+    cursor = ServerCursor(FakeCursor())
+    assert cursor.fetchmany() == [(1,), (2,)]
+    assert cursor.fetchmany(5) == [(3,)]
@@ -0,0 +1,35 @@
+import random
+
+from database import Database
+from query_monitor import WRITE_BATCH, QueryStats, normalize_sql
+
+def test_placeholder_lists_share_one_query_shape():
+    assert normalize_sql('SELECT * FROM t\n  WHERE id IN (?, ?, ?)') == 'SELECT * FROM t WHERE id IN (?, …)'
+    assert normalize_sql('VALUES (?, ?), (?, ?), (?, ?)') == 'VALUES (?, …), …'
+
+def test_percentiles_from_histogram():
+    stats = QueryStats('method', 'SELECT 1')
+    latencies = sorted(random.Random(1).expovariate(1 / 3) for _ in range(5000))
+    for ms in latencies:
+        stats.add(ms, 1, 0, 1, 'Dashboard')
+    assert abs(stats.percentile(0.5) - latencies[2500]) < 0.5
+    assert abs(stats.percentile(0.95) - latencies[4750]) < 2
+    single = QueryStats('method', 'SELECT 1')
+    single.add(3.2, 1, 0, 1, None)
+    assert single.percentile(0.5) == single.percentile(0.95) == 3.2
+    assert dict(single.pages) == {}
+
+def test_writer_statements_are_attributed_to_the_submitting_job():
+    db = Database(':memory:')
+    db.enable_monitoring(slow_ms=10 ** 6)
+    with db.page('Teaching Diary'):
+        db.create_teacher('teacher', 'secret', 'Teacher')
+    
+    by_sql = {query['sql']: query for query in db.monitor.report()}
+    for sql in ('SAVEPOINT job', 'RELEASE SAVEPOINT job'):
+        assert by_sql[sql]['method'] == 'create_teacher'
+        assert by_sql[sql]['pages'] == {'Teaching Diary': 1}
+    for sql in ('BEGIN IMMEDIATE', 'COMMIT'):
+        assert by_sql[sql]['method'] == WRITE_BATCH
+        assert by_sql[sql]['pages'] == {}
+    assert not any(query['method'] is None for query in by_sql.values())
@@ -0,0 +1,25 @@
+import pytest
+
+from transliteration import highlight, term_key, text_terms, trigrams
+
+@pytest.mark.parametrize('word', ['Vata', 'vata', 'Vāta', 'VĀTA', 'Waata', 'वात'])
+def test_term_key_folds_spellings_of_vata(word):
+    assert term_key(word) == 'vat'
+
+@pytest.mark.parametrize('spellings, key', [
+    (['Pitta', 'Pita', 'पित्त'], 'pit'),
+    (['Kapha', 'कफ'], 'kap'),
+    (['Shleshma', 'Śleṣma'], 'slesm'),
+])
+def test_term_key_folds_aspirates_and_sibilants(spellings, key):
+    assert {term_key(word) for word in spellings} == {key}
+
+def test_text_terms_skips_stopwords():
+    assert text_terms('The Vāta and pitta doshas') == ['vat', 'pit', 'dosas']
+    assert text_terms(None) == []
+
+def test_trigrams_pad_short_keys():
+    assert trigrams('vat') == {'$va', 'vat', 'at$'}
+
+def test_highlight_marks_folded_matches():
+    assert highlight('Vāta and Vata dosha', {'vat'}) == '**Vāta** and **Vata** dosha'
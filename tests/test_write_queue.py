@@ -0,0 +1,58 @@
+import sqlite3
+import threading
+
+import pytest
+
+import database
+from database import SQLiteBackend, WriteQueue
+
+class FlakyBackend(SQLiteBackend):
+    """SQLite backend whose first connect() waits for a go-ahead, then fails"""
+    
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.failures = 1
+        self.go = threading.Event()
+    
+    def connect(self):
+        if self.failures:
+            self.go.wait(5)
+            self.failures -= 1
+            raise sqlite3.OperationalError('unable to open database file')
+        return super().connect()
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = FlakyBackend(str(tmp_path / 'writes.db'))
+    with sqlite3.connect(backend.db_path) as conn:
+        conn.execute('CREATE TABLE notes (text TEXT)')
+    return backend
+
+def insert(text):
+    return lambda conn: conn.execute('INSERT INTO notes VALUES (?)', (text,)).rowcount
+
+def test_failed_connect_fails_queued_jobs(backend):
+    writer = WriteQueue(backend)
+    futures = [writer.submit(insert(f'note {i}')) for i in range(3)]
+    backend.go.set()
+    for future in futures:
+        with pytest.raises(sqlite3.OperationalError, match='unable to open'):
+            future.result(timeout=5)
+
+def test_next_write_starts_a_new_writer(backend):
+    writer = WriteQueue(backend)
+    backend.go.set()
+    with pytest.raises(sqlite3.OperationalError):
+        writer.run(insert('lost'))
+    assert writer.run(insert('kept')) == 1
+    with sqlite3.connect(backend.db_path) as conn:
+        assert conn.execute('SELECT text FROM notes').fetchall() == [('kept',)]
+
+def test_run_times_out(backend, monkeypatch):
+    monkeypatch.setattr(database, 'WRITE_TIMEOUT_S', 0.1)
+    backend.failures = 0
+    release = threading.Event()
+    writer = WriteQueue(backend)
+    with pytest.raises(TimeoutError, match='not finished'):
+        writer.run(lambda conn: release.wait(5))
+    release.set()